@@ -1,25 +1,71 @@
-from services.llm_client import call_llm
+import asyncio
+import logging
+
+from services.llm_client import (
+    acall_llm,
+    astream_llm,
+    MODEL,
+    SUMMARIZER_SYSTEM_PROMPT
+)
+from services.summary_cache import get_summary_cache, fingerprint
+from services.email_text import prepare_body, truncate_to_tokens, count_tokens, CLEANING_VERSION
+from services.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Prompt budget in tokens, spent on cleaned text rather than raw markup
+SUMMARY_BODY_TOKENS = 500
+SUMMARY_ATTACHMENT_TOKENS = 250
+
+SUMMARY_PROMPT = """
+You're a friendly email assistant. Summarize this email naturally and conversationally.
+
+Keep it brief (1–2 sentences). No links, no tech talk.
+
+Email from: {sender}
+
+{context}
+
+Quick summary:
+"""
 
-MAX_BODY_CHARS = 2000
-MAX_ATTACHMENT_CHARS = 1000
+# Any change to the prompt, model, cleaning or budgets invalidates cached summaries
+SUMMARY_PROMPT_VERSION = fingerprint(
+    SUMMARY_PROMPT,
+    SUMMARIZER_SYSTEM_PROMPT,
+    MODEL,
+    str(CLEANING_VERSION),
+    str(SUMMARY_BODY_TOKENS),
+    str(SUMMARY_ATTACHMENT_TOKENS)
+)
 
 
-def summarize_email_logic(body: str, sender: str, subject: str = "", attachments: str = ""):
+def build_summary_prompt(body: str, sender: str, subject: str = "", attachments: str = "") -> str:
     """
-    Summarize email body and attachments in a natural, conversational way
+    Clean and budget the email, then fill in SUMMARY_PROMPT
     """
+    with timed("prompt.summary"):
+        return _build_summary_prompt(body, sender, subject, attachments)
+
 
-    # ---- TRUNCATION (THIS WAS THE ISSUE) ----
-    if body and len(body) > MAX_BODY_CHARS:
-        body = body[:MAX_BODY_CHARS] + "\n...(truncated)"
+def _build_summary_prompt(body, sender, subject, attachments):
+    # ---- CLEANING + TOKEN BUDGET ----
+    body, truncated = prepare_body(body, SUMMARY_BODY_TOKENS)
+    if truncated:
+        body += "\n...(truncated)"
 
-    if attachments and len(attachments) > MAX_ATTACHMENT_CHARS:
-        attachments = attachments[:MAX_ATTACHMENT_CHARS] + "\n...(truncated)"
+    attachments, truncated = truncate_to_tokens(attachments, SUMMARY_ATTACHMENT_TOKENS)
+    if truncated:
+        attachments += "\n...(truncated)"
 
-    print(f"\n=== Summarizing email from {sender} ===")
-    print(f"Subject: {subject}")
-    print(f"Body length: {len(body)} chars")
-    print(f"Attachment text length: {len(attachments)} chars")
+    # Counting tokens costs a pass over the text; only pay for it when logged
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("summary prompt built", extra={
+            "sender": sender,
+            "subject": subject,
+            "body_tokens": count_tokens(body),
+            "attachment_tokens": count_tokens(attachments)
+        })
 
     context_parts = []
 
@@ -34,26 +80,86 @@ def summarize_email_logic(body: str, sender: str, subject: str = "", attachments
     if attachments and attachments.strip():
         context_parts.append(f"\nAttachments:\n{attachments}")
 
-    full_prompt = f"""
-You're a friendly email assistant. Summarize this email naturally and conversationally.
+    return SUMMARY_PROMPT.format(
+        sender=sender,
+        context=chr(10).join(context_parts)
+    )
 
-Keep it brief (1–2 sentences). No links, no tech talk.
 
-Email from: {sender}
+def _fallback_summary(body, subject):
+    # Fallbacks are not cached so the next request retries the LLM
+    body, _ = prepare_body(body, SUMMARY_BODY_TOKENS)
+    if body:
+        return f"It's about {body[:80]}..."
+    elif subject:
+        return f"Email about: {subject}"
+    else:
+        return "Email received."
 
-{chr(10).join(context_parts)}
 
-Quick summary:
-"""
+async def summarize_email_with_source_async(body: str, sender: str, subject: str = "", attachments: str = "",
+                                            message_id: str = None, on_token=None):
+    """
+    Summarize email body and attachments in a natural, conversational way
+
+    Results are cached per message (or per content when no message_id is
+    given) and reused until the content or SUMMARY_PROMPT_VERSION changes;
+    the cache (SQLite) and the HTML cleanup run in the default executor.
+    When on_token is given the completion is streamed and each text delta
+    is passed to it (a cached summary arrives as a single delta).
+
+    Concurrent misses for the same message share one LLM call; callers
+    that waited on another's call get the finished summary as a single
+    delta.
+
+    Returns:
+        (summary, source); source is "cache", "llm" or "fallback" (the
+        LLM failed and the summary is an uncached local stand-in)
+    """
+    cache = get_summary_cache()
+    content_hash = fingerprint(sender, subject, body, attachments)
+    cache_id = message_id or content_hash
+
+    cached = await asyncio.to_thread(cache.get, "summary", cache_id, content_hash, SUMMARY_PROMPT_VERSION)
+    if cached is not None:
+        if on_token:
+            on_token(cached)
+        return cached, "cache"
+
+    streamed = False
+
+    def forward(delta):
+        nonlocal streamed
+        streamed = True
+        on_token(delta)
+
+    async def compute():
+        return await _summarize_uncached_async(
+            body, sender, subject, attachments, cache_id, content_hash,
+            forward if on_token else None
+        )
+
+    summary, source = await cache.single_flight("summary", cache_id, compute)
+    if on_token and not streamed:
+        on_token(summary)
+    return summary, source
+
+
+async def _summarize_uncached_async(body, sender, subject, attachments, cache_id, content_hash, on_token):
+    full_prompt = await asyncio.to_thread(build_summary_prompt, body, sender, subject, attachments)
 
     try:
-        summary = call_llm(full_prompt)
-        return summary.strip()
-    except Exception as e:
-        print(f"LLM error: {e}")
-        if body:
-            return f"It's about {body[:80]}..."
-        elif subject:
-            return f"Email about: {subject}"
+        if on_token is None:
+            summary = (await acall_llm(full_prompt, stage="llm.summary")).strip()
         else:
-            return "Email received."
+            parts = []
+            async for delta in astream_llm(full_prompt, stage="llm.summary"):
+                parts.append(delta)
+                on_token(delta)
+            summary = "".join(parts).strip()
+    except Exception as e:
+        logger.warning("summary failed, using fallback", extra={"sender": sender, "error": str(e)})
+        return _fallback_summary(body, subject), "fallback"
+
+    await asyncio.to_thread(get_summary_cache().put, "summary", cache_id, content_hash, SUMMARY_PROMPT_VERSION, summary)
+    return summary, "llm"
@@ -1,71 +1,153 @@
 import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from ai_logic.readers import pdf_reader, word_reader, excel_reader, csv_reader, image_reader
 from ai_logic.readers.pdf_reader import extract_text_from_pdf
 from ai_logic.readers.word_reader import extract_text_from_docx
 from ai_logic.readers.excel_reader import extract_text_from_xlsx
 from ai_logic.readers.csv_reader import extract_text_from_csv
 from ai_logic.readers.image_reader import extract_text_from_image
+from ai_logic.readers.extraction_cache import cache_key, get_extraction_cache
+from ai_logic.readers.source import open_source
+from ai_logic.readers.extraction_pool import (
+    ATTACHMENT_TIMEOUT,
+    ExtractionTimeout,
+    WorkerCrashed,
+    get_extraction_pool
+)
+from services.metrics import timed, carry_timings
 
+logger = logging.getLogger(__name__)
 
-def process_attachment(file_path, filename):
+# Readers stop extracting once they hit these character budgets
+PDF_CHAR_BUDGET = 1500
+DOCX_CHAR_BUDGET = 1500
+IMAGE_CHAR_BUDGET = 1000
+
+# extension -> (reader name, reader version) used in the extraction cache key
+READERS = {
+    '.pdf': ("pdf", pdf_reader.READER_VERSION),
+    '.docx': ("docx", word_reader.READER_VERSION),
+    '.xlsx': ("xlsx", excel_reader.READER_VERSION),
+    '.csv': ("csv", csv_reader.READER_VERSION),
+    '.png': ("ocr", image_reader.READER_VERSION),
+    '.jpg': ("ocr", image_reader.READER_VERSION),
+    '.jpeg': ("ocr", image_reader.READER_VERSION),
+}
+
+
+def process_attachment(source, filename, pool=None, timeout=ATTACHMENT_TIMEOUT):
     """
-    Process an attachment and extract text based on file type
-    
+    Process an attachment and extract text based on file type, reusing a
+    cached result when the same bytes were already extracted
+
+    `source` is the attachment's bytes, a binary buffer, or a file path.
+    With a `pool`, the reader runs in a worker process and is abandoned
+    after `timeout` seconds.
+
     Returns:
         dict with 'filename', 'type', and 'content'
     """
-    
+
     extension = os.path.splitext(filename)[1].lower()
-    
+    reader = READERS.get(extension)
+
+    if reader is None:
+        return extract_attachment(source, filename, extension)
+
+    key = cache_key(source, *reader)
+
+    cache = get_extraction_cache()
+    cached = cache.get(key)
+    if cached is not None:
+        return {"filename": filename, **cached}
+
+    with timed(f"reader.{reader[0]}"):
+        if pool is None:
+            result = extract_attachment(source, filename, extension)
+        else:
+            try:
+                # Buffers don't pickle; workers get bytes or a path
+                if not isinstance(source, (bytes, str, os.PathLike)):
+                    with open_source(source) as f:
+                        source = f.read()
+                result = pool.run(extract_attachment, (source, filename, extension), timeout)
+            except ExtractionTimeout as e:
+                return {
+                    "filename": filename,
+                    "type": "Timeout",
+                    "content": f"Error: {e}",
+                    "truncated": False
+                }
+            except WorkerCrashed as e:
+                return {
+                    "filename": filename,
+                    "type": "Error",
+                    "content": f"Error processing file: {e}",
+                    "truncated": False
+                }
+
+    # Reader failures come back as "[ERROR ...]" text; retry those next time
+    if result["type"] != "Error" and not result["content"].startswith("[ERROR"):
+        cache.put(key, {k: v for k, v in result.items() if k != "filename"})
+
+    return result
+
+
+def extract_attachment(source, filename, extension):
+    """
+    Run the reader for `extension` on the source, without caching
+    """
+
     try:
         if extension == '.pdf':
-            content = extract_text_from_pdf(file_path)
-            # Limit PDF content to first 1500 chars
-            content = content[:1500] if len(content) > 1500 else content
+            content, truncated, total = extract_text_from_pdf(source, max_chars=PDF_CHAR_BUDGET)
             return {
                 "filename": filename,
                 "type": "PDF",
                 "content": content,
-                "truncated": len(extract_text_from_pdf(file_path)) > 1500
+                "truncated": truncated,
+                "total_chars": total
             }
         
         elif extension == '.docx':
-            content = extract_text_from_docx(file_path)
-            # Limit Word content
-            content = content[:1500] if len(content) > 1500 else content
+            content, truncated, total = extract_text_from_docx(source, max_chars=DOCX_CHAR_BUDGET)
             return {
                 "filename": filename,
                 "type": "Word Document",
                 "content": content,
-                "truncated": len(extract_text_from_docx(file_path)) > 1500
+                "truncated": truncated,
+                "total_chars": total
             }
         
         elif extension == '.xlsx':
-            content = extract_text_from_xlsx(file_path, max_rows=20)  # Reduced rows
+            content, truncated, total = extract_text_from_xlsx(source, max_rows=20)  # Reduced rows
             return {
                 "filename": filename,
                 "type": "Excel Spreadsheet",
                 "content": content,
-                "truncated": False
+                "truncated": truncated,
+                "total_chars": total
             }
         
         elif extension == '.csv':
-            content = extract_text_from_csv(file_path, max_rows=20)  # Reduced rows
+            content, truncated, total = extract_text_from_csv(source, max_rows=20)  # Reduced rows
             return {
                 "filename": filename,
                 "type": "CSV File",
                 "content": content,
-                "truncated": False
+                "truncated": truncated,
+                "total_chars": total
             }
         
         elif extension in ['.png', '.jpg', '.jpeg']:
-            content = extract_text_from_image(file_path)
-            # Limit image OCR content
-            content = content[:1000] if len(content) > 1000 else content
+            content, truncated, total = extract_text_from_image(source, max_chars=IMAGE_CHAR_BUDGET)
             return {
                 "filename": filename,
                 "type": "Image",
                 "content": content,
-                "truncated": len(extract_text_from_image(file_path)) > 1000
+                "truncated": truncated,
+                "total_chars": total
             }
         
         else:
@@ -85,20 +167,36 @@ def process_attachment(file_path, filename):
         }
 
 
+def attachment_source(attachment):
+    """
+    In-memory attachments carry 'data'; ones spooled to disk carry 'path'
+    """
+    if 'data' in attachment:
+        return attachment['data']
+    return attachment['path']
+
+
 def process_all_attachments(attachments):
     """
     Process multiple attachments and return their contents
+
+    Extraction fans out across the shared process pool; attachments that
+    time out come back as "Timeout" entries next to the ones that finished.
     """
-    processed = []
-    
-    for attachment in attachments:
-        result = process_attachment(
-            attachment['path'],
-            attachment['filename']
-        )
-        processed.append(result)
-    
-    return processed
+    pool = get_extraction_pool()
+
+    if pool is None or len(attachments) <= 1:
+        return [
+            process_attachment(attachment_source(a), a['filename'], pool=pool)
+            for a in attachments
+        ]
+
+    # Threads only wait on worker pipes; the CPU work happens in the pool
+    with ThreadPoolExecutor(max_workers=len(attachments)) as executor:
+        return list(executor.map(
+            carry_timings(lambda a: process_attachment(attachment_source(a), a['filename'], pool=pool)),
+            attachments
+        ))
 
 
 def create_attachment_summary(processed_attachments):
@@ -126,19 +224,14 @@ def create_attachment_summary(processed_attachments):
 
 def cleanup_attachments(attachments):
     """
-    Delete temporary attachment files
+    Delete temporary files for attachments that were spooled to disk
     """
     for attachment in attachments:
+        path = attachment.get('path')
+        if not path:
+            continue
         try:
-            if os.path.exists(attachment['path']):
-                os.remove(attachment['path'])
-        except Exception as e:
-            print(f"Error cleaning up {attachment['filename']}: {str(e)}")
-    
-    # Clean up temp directory if empty
-    try:
-        temp_dir = "temp_attachments"
-        if os.path.exists(temp_dir) and not os.listdir(temp_dir):
-            os.rmdir(temp_dir)
-    except Exception as e:
-        print(f"Error cleaning up temp directory: {str(e)}")
\ No newline at end of file
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception:
+            logger.warning("attachment cleanup failed", extra={"filename": attachment['filename']}, exc_info=True)
@@ -1,18 +1,29 @@
+import io
 import csv
 
-def extract_text_from_csv(file_path, max_rows=50):
+from ai_logic.readers.source import open_source, apply_budget
+
+READER_VERSION = 2
+
+def extract_text_from_csv(source, max_rows=50, max_chars=None):
     """
-    Extract text from CSV with better formatting
+    Extract text from CSV (path, bytes or file-like) with better formatting
+
+    Returns:
+        (text, truncated, total length)
     """
     text = []
 
     try:
-        with open(file_path, newline="", encoding="utf-8", errors="ignore") as f:
+        with open_source(source) as raw:
+            f = io.TextIOWrapper(raw, newline="", encoding="utf-8", errors="ignore")
             reader = csv.reader(f)
             rows = list(reader)
+            # Hand the buffer back un-closed; the caller may still own it
+            f.detach()
 
             if not rows:
-                return "[Empty CSV file]"
+                return apply_budget("[Empty CSV file]")
 
             # Headers
             headers = rows[0]
@@ -38,6 +49,6 @@ def extract_text_from_csv(file_path, max_rows=50):
                 text.append(f"\n[{total_rows - max_rows} more rows not shown]")
 
     except Exception as e:
-        return f"[ERROR reading CSV: {str(e)}]"
+        return apply_budget(f"[ERROR reading CSV: {str(e)}]")
 
-    return "\n".join(text)
\ No newline at end of file
+    return apply_budget("\n".join(text), max_chars)
\ No newline at end of file
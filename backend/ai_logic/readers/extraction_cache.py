@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+from ai_logic.readers.source import open_source
+from services.metrics import timed
+from services.sqlite_cache import SQLiteCache
+
+EXTRACTION_CACHE_PATH = os.getenv("EXTRACTION_CACHE_PATH", "cache/extractions.db")
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", 100 * 1024 * 1024))
+EXTRACTION_CACHE_MEMORY_ENTRIES = int(os.getenv("EXTRACTION_CACHE_MEMORY_ENTRIES", 256))
+
+
+def cache_key(source, reader, version):
+    """
+    Content address for an extraction: the same bytes read by the same
+    reader version always produce the same text, whatever the filename
+    or message they arrived in. Bumping a reader's READER_VERSION
+    orphans its old entries.
+    """
+    sha = hashlib.sha256()
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        sha.update(source)
+    else:
+        with open_source(source) as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(chunk)
+
+    return f"{reader}:{version}:{sha.hexdigest()}"
+
+
+class ExtractionCache(SQLiteCache):
+    """
+    Two-tier cache of attachment extraction results.
+
+    A small in-process LRU sits in front of a SQLite table that survives
+    restarts; disk hits are promoted into memory.
+    """
+
+    TABLE = "extractions"
+
+    def __init__(self, path=EXTRACTION_CACHE_PATH, max_bytes=EXTRACTION_CACHE_MAX_BYTES,
+                 memory_entries=EXTRACTION_CACHE_MEMORY_ENTRIES):
+        super().__init__(
+            path,
+            [
+                """
+                CREATE TABLE IF NOT EXISTS extractions (
+                    key TEXT PRIMARY KEY,
+                    result TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """,
+                "CREATE INDEX IF NOT EXISTS idx_extractions_accessed ON extractions(accessed_at)"
+            ],
+            max_bytes=max_bytes,
+            memory_entries=memory_entries
+        )
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with timed("cache.extraction"):
+            with self._memory_lock:
+                result = self._recall(key)
+                if result is not None:
+                    self.memory_hits += 1
+                    return dict(result)
+
+            row = self._conn().execute(
+                "SELECT result FROM extractions WHERE key = ?", (key,)
+            ).fetchone()
+
+            with self._memory_lock:
+                if row is None:
+                    self.misses += 1
+                    return None
+
+                result = json.loads(row[0])
+                self.disk_hits += 1
+                self._remember(key, result)
+
+            self._touch(key)
+            return dict(result)
+
+    def put(self, key, result):
+        encoded = json.dumps(result)
+
+        with self._memory_lock:
+            self._remember(key, result)
+
+        self._store(
+            "INSERT OR REPLACE INTO extractions (key, result, size, accessed_at) "
+            "VALUES (?, ?, ?, ?)",
+            (key, encoded, len(encoded), time.time())
+        )
+
+    def stats(self):
+        entries, total = self._disk_usage()
+
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+            "disk_entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes
+        }
+
+
+_extraction_cache = None
+_extraction_cache_lock = threading.Lock()
+
+
+def get_extraction_cache():
+    global _extraction_cache
+
+    if _extraction_cache is None:
+        with _extraction_cache_lock:
+            if _extraction_cache is None:
+                _extraction_cache = ExtractionCache()
+
+    return _extraction_cache
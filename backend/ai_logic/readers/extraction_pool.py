@@ -0,0 +1,164 @@
+import os
+import queue
+import threading
+import time
+import multiprocessing
+
+ATTACHMENT_WORKERS = int(os.getenv("ATTACHMENT_WORKERS", min(4, os.cpu_count() or 1)))
+ATTACHMENT_TIMEOUT = float(os.getenv("ATTACHMENT_TIMEOUT", 20))
+ATTACHMENT_WORKER_MEMORY_MB = int(os.getenv("ATTACHMENT_WORKER_MEMORY_MB", 1024))
+
+
+class ExtractionTimeout(Exception):
+    pass
+
+
+class WorkerCrashed(Exception):
+    pass
+
+
+def _limit_memory(memory_mb):
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows; run without a cap
+        return
+
+    limit = memory_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError):
+        pass
+
+
+def _worker_main(conn, memory_mb):
+    _limit_memory(memory_mb)
+
+    while True:
+        try:
+            fn, args = conn.recv()
+        except (EOFError, OSError):
+            return
+
+        try:
+            conn.send((True, fn(*args)))
+        except BaseException as e:
+            conn.send((False, f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    def __init__(self, ctx, memory_mb):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child, memory_mb),
+            daemon=True
+        )
+        self.process.start()
+        child.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+
+class ExtractionPool:
+    """
+    Bounded pool of reader processes with per-task wall-clock timeouts.
+
+    Each worker runs one extraction at a time over its own pipe, so a
+    task that overruns its deadline is cancelled by killing exactly that
+    worker (and starting a fresh one lazily) without disturbing other
+    requests' extractions. Workers run under an address-space limit so a
+    pathological file fails with MemoryError instead of taking the host
+    down. Processes are spawned, not forked, because the API server is
+    multi-threaded.
+    """
+
+    def __init__(self, workers=ATTACHMENT_WORKERS, memory_mb=ATTACHMENT_WORKER_MEMORY_MB):
+        self.workers = workers
+        self.memory_mb = memory_mb
+        self._ctx = multiprocessing.get_context("spawn")
+        self._slots = queue.Queue()
+        self.timeouts = 0
+        self.crashes = 0
+
+        # None marks a slot whose worker has not been started yet
+        for _ in range(workers):
+            self._slots.put(None)
+
+    def run(self, fn, args, timeout=ATTACHMENT_TIMEOUT):
+        """
+        Run fn(*args) in a worker process and return its result
+
+        Raises ExtractionTimeout if no worker frees up or the task does not
+        finish within `timeout` seconds, and WorkerCrashed if the worker
+        dies or the task raises.
+        """
+        deadline = time.monotonic() + timeout
+
+        try:
+            worker = self._slots.get(timeout=timeout)
+        except queue.Empty:
+            self.timeouts += 1
+            raise ExtractionTimeout(f"no extraction worker free within {timeout:g}s")
+
+        if worker is None or not worker.process.is_alive():
+            worker = _Worker(self._ctx, self.memory_mb)
+
+        try:
+            worker.conn.send((fn, args))
+
+            if not worker.conn.poll(max(0.0, deadline - time.monotonic())):
+                worker.kill()
+                worker = None
+                self.timeouts += 1
+                raise ExtractionTimeout(f"extraction exceeded {timeout:g}s")
+
+            ok, value = worker.conn.recv()
+
+        except (EOFError, OSError):
+            # Killed by the memory limit or crashed inside a C extension
+            if worker is not None:
+                worker.kill()
+            worker = None
+            self.crashes += 1
+            raise WorkerCrashed("extraction worker died")
+
+        finally:
+            self._slots.put(worker)
+
+        if not ok:
+            raise WorkerCrashed(value)
+
+        return value
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "memory_mb": self.memory_mb,
+            "timeouts": self.timeouts,
+            "crashes": self.crashes
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_extraction_pool():
+    """
+    Shared pool, or None when ATTACHMENT_WORKERS=0 (extract in-process)
+    """
+    global _pool
+
+    if ATTACHMENT_WORKERS <= 0:
+        return None
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ExtractionPool()
+
+    return _pool
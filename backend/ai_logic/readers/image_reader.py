@@ -1,16 +1,29 @@
 from PIL import Image
 import pytesseract
 
-def extract_text_from_image(image_path):
+from ai_logic.readers.source import open_source, apply_budget
+
+READER_VERSION = 2
+
+def extract_text_from_image(source, max_chars=None):
     """
-    Extract text from image using OCR
+    Extract text from image (path, bytes or file-like) using OCR
+
+    Tesseract can't stop partway, so the budget only trims the result.
+
+    Returns:
+        (text, truncated, total length)
     """
     try:
-        image = Image.open(image_path)
-        
-        # Convert to RGB if needed (some images are RGBA, CMYK, etc.)
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
+        with open_source(source) as f:
+            image = Image.open(f)
+
+            # Convert to RGB if needed (some images are RGBA, CMYK, etc.)
+            # and force the lazy decoder to finish while the source is open
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            else:
+                image.load()
 
         # Improve OCR accuracy
         custom_config = r"--oem 3 --psm 6"
@@ -24,11 +37,11 @@ def extract_text_from_image(image_path):
         extracted_text = text.strip()
         
         if not extracted_text:
-            return "[No text detected in image]"
+            return apply_budget("[No text detected in image]")
         
-        return extracted_text
+        return apply_budget(extracted_text, max_chars)
 
     except pytesseract.TesseractNotFoundError:
-        return "[ERROR: Tesseract OCR not installed. Please install it to read images.]"
+        return apply_budget("[ERROR: Tesseract OCR not installed. Please install it to read images.]")
     except Exception as e:
-        return f"[ERROR reading image: {str(e)}]"
\ No newline at end of file
+        return apply_budget(f"[ERROR reading image: {str(e)}]")
@@ -2,29 +2,54 @@ import warnings
 import logging
 import pdfplumber
 
+from ai_logic.readers.source import open_source, apply_budget
+
 warnings.filterwarnings("ignore")
 logging.getLogger("pdfminer").setLevel(logging.ERROR)
 
-def extract_text_from_pdf(path, max_pages=5):
+READER_VERSION = 2
+
+def extract_text_from_pdf(source, max_pages=5, max_chars=None):
     """
     Extract text from PDF, limiting to first few pages for efficiency
+
+    `source` may be a path, bytes, or a binary file-like object. Pages are
+    parsed only until `max_chars` is reached; the total length of the
+    unread pages is extrapolated from the ones that were parsed.
+
+    Returns:
+        (text, truncated, estimated total length)
     """
-    text = ""
+    parts = []
+    length = 0
     try:
-        with pdfplumber.open(path) as pdf:
+        with open_source(source) as f, pdfplumber.open(f) as pdf:
+            total_pages = len(pdf.pages)
             # Limit pages to avoid huge PDFs
-            pages_to_read = min(len(pdf.pages), max_pages)
-            
+            pages_to_read = min(total_pages, max_pages)
+            pages_read = 0
+
             for page_num in range(pages_to_read):
                 page_text = pdf.pages[page_num].extract_text()
+                pages_read += 1
                 if page_text:
-                    text += page_text + "\n"
-            
+                    page_text = " ".join(page_text.split())
+                    parts.append(page_text)
+                    length += len(page_text) + 1
+
+                if max_chars is not None and length >= max_chars:
+                    break
+
             # Indicate if there are more pages
-            if len(pdf.pages) > max_pages:
-                text += f"\n[Note: PDF has {len(pdf.pages)} total pages, only first {max_pages} extracted]"
-                
+            if total_pages > max_pages:
+                parts.append(f"[Note: PDF has {total_pages} total pages, only first {max_pages} extracted]")
+
     except Exception as e:
-        return f"[ERROR reading PDF: {str(e)}]"
+        return apply_budget(f"[ERROR reading PDF: {str(e)}]")
+
+    text = " ".join(parts)
+    estimated_total = len(text)
+    if pages_read < pages_to_read:
+        estimated_total = int(length / pages_read * pages_to_read)
 
-    return " ".join(text.split())
\ No newline at end of file
+    return apply_budget(text, max_chars, estimated_total)
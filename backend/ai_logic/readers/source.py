@@ -0,0 +1,39 @@
+import io
+import os
+from contextlib import contextmanager
+
+
+def is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+
+@contextmanager
+def open_source(source):
+    """
+    Yield a seekable binary file object for any attachment source:
+    a filesystem path, raw bytes / memoryview, or an open file-like buffer
+    """
+    if is_path(source):
+        with open(source, "rb") as f:
+            yield f
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+    else:
+        source.seek(0)
+        yield source
+
+
+def apply_budget(text, max_chars=None, total_chars=None):
+    """
+    Cut `text` to the character budget
+
+    Returns:
+        (text, truncated, estimated total length)
+    """
+    if total_chars is None:
+        total_chars = len(text)
+
+    if max_chars is None or len(text) <= max_chars:
+        return text, total_chars > len(text), total_chars
+
+    return text[:max_chars], True, max(total_chars, len(text))
@@ -1,17 +1,37 @@
 from docx import Document
 
-def extract_text_from_docx(file_path):
+from ai_logic.readers.source import open_source, apply_budget
+
+READER_VERSION = 2
+
+def extract_text_from_docx(source, max_chars=None):
+    """
+    Extract paragraphs then tables, stopping once `max_chars` is reached
+
+    Returns:
+        (text, truncated, estimated total length)
+    """
     try:
-        doc = Document(file_path)
+        with open_source(source) as f:
+            doc = Document(f)
         text = []
+        length = 0
 
         # Extract normal paragraphs
-        for para in doc.paragraphs:
+        paragraphs = doc.paragraphs
+        seen = 0
+        for para in paragraphs:
+            if max_chars is not None and length >= max_chars:
+                break
+            seen += 1
             if para.text and para.text.strip():
                 text.append(para.text.strip())
+                length += len(text[-1]) + 1
 
         # Extract tables (important for reports/invoices)
         for table in doc.tables:
+            if max_chars is not None and length >= max_chars:
+                break
             for row in table.rows:
                 row_text = [
                     cell.text.strip()
@@ -20,8 +40,18 @@ def extract_text_from_docx(file_path):
                 ]
                 if row_text:
                     text.append(" | ".join(row_text))
+                    length += len(text[-1]) + 1
+
+        joined = "\n".join(text)
+        estimated_total = len(joined)
+
+        if seen < len(paragraphs):
+            # Extrapolate from the paragraphs read; unread tables aren't counted
+            estimated_total = int(length / max(seen, 1) * len(paragraphs))
+        elif max_chars is not None and length >= max_chars and doc.tables:
+            estimated_total = max(estimated_total, length + 1)
 
-        return "\n".join(text)
+        return apply_budget(joined, max_chars, estimated_total)
 
     except Exception as e:
-        return f"[ERROR reading document: {str(e)}]"
+        return apply_budget(f"[ERROR reading document: {str(e)}]")
@@ -1,17 +1,54 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse, Response, PlainTextResponse
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
-import traceback
+from functools import partial
+from collections import OrderedDict
+import asyncio
+import logging
+import json
 import re
 
-from services.email_categorizer import get_email_category
-from services.gmail_client import get_unread_emails
-from ai_logic.email import summarize_email_logic
-from services.llm_client import intelligent_command_handler
+from services.email_categorizer import (
+    get_email_category_and_tier_async,
+    get_email_categories_and_tiers_async,
+    categorization_stats,
+    CATEGORY_PROMPT_VERSION
+)
+from services.gmail_client import FETCH_HEADERS
+from services.inbox_snapshot import (
+    get_inbox_snapshot_async,
+    get_inbox_snapshots,
+    invalidate_inbox_snapshots,
+    inbox_version
+)
+from ai_logic.email import summarize_email_with_source_async, SUMMARY_PROMPT_VERSION
+from services.intent_router import get_intent_router
+from services.session_store import get_session_store
+from services.gmail_async import get_async_gmail_client
+from services.prefetch_worker import PrefetchWorker, PREFETCH_ENABLED
+from services.llm_client import (
+    aselect_tool_call,
+    parse_tool_calls,
+    aexecute_tool_call,
+    arun_tools,
+    amap_concurrent,
+    llm_stats,
+    LLMUnavailable,
+    LLM_MAX_CONCURRENCY
+)
+from services.message_cache import get_message_cache
+from services.summary_cache import get_summary_cache, fingerprint
+from ai_logic.readers.extraction_cache import get_extraction_cache
+from ai_logic.readers.extraction_pool import get_extraction_pool
+from services.metrics import ServerTimingMiddleware, render_metrics
+from services.logging_config import configure_logging
 
 load_dotenv()
+configure_logging()
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="InboxAI Backend")
 
@@ -22,11 +59,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Read by the popup to revalidate inbox views with If-None-Match
+    expose_headers=["ETag", "X-Session-Id", "Server-Timing"],
 )
 
+# ============================ METRICS ============================
+# Per-stage timings: Server-Timing header on every response, histograms on /metrics
+app.add_middleware(ServerTimingMiddleware)
+
+# ============================ LIFECYCLE ============================
+@app.on_event("startup")
+async def start_prefetch():
+    if PREFETCH_ENABLED:
+        prefetch_worker.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await prefetch_worker.stop()
+    await get_async_gmail_client().aclose()
+
 # ============================ MODELS ============================
 class CommandPayload(BaseModel):
     command: str
+    # Returned by every /command reply; the server keeps the conversation
+    session_id: Optional[str] = None
+    # Legacy: full client-side history, only used to seed a new session
     history: Optional[List[Dict[str, str]]] = []
 
 # ============================ ROOT ============================
@@ -42,8 +100,13 @@ def normalize(text: str) -> str:
     return re.sub(r"[^a-z]", "", text.lower())
 
 
-def check_emails_from_sender(sender_query: str):
-    emails = get_unread_emails() or []
+# Every command tool takes an optional `emails` snapshot; run_tool_calls
+# passes one shared snapshot so concurrent tools read the same inbox
+
+async def check_emails_from_sender(sender_query: str, emails=None):
+    if emails is None:
+        # Only the From header is needed, so skip bodies and attachments
+        emails = await get_inbox_snapshot_async(level=FETCH_HEADERS)
     normalized_query = normalize(sender_query)
 
     matched = [
@@ -73,29 +136,40 @@ def check_emails_from_sender(sender_query: str):
     }
 
 
-def get_unread_emails_summary():
-    emails = get_unread_emails() or []
+async def summarize_email(email, on_token=None):
+    """
+    Returns:
+        (summary, source); source "fallback" means the LLM failed
+    """
+    return await summarize_email_with_source_async(
+        body=email.get("body", ""),
+        sender=email.get("from", "Unknown sender"),
+        subject=email.get("subject", "No Subject"),
+        attachments=email.get("attachment_text", ""),
+        message_id=email.get("id"),
+        on_token=on_token
+    )
 
-    if not emails:
-        return {
-            "reply": "You have no unread emails.",
-            "data": None
-        }
 
+async def categorize_email(email):
+    category, _ = await get_email_category_and_tier_async(
+        email.get("body", ""),
+        email.get("from", ""),
+        email.get("subject", ""),
+        message_id=email.get("id"),
+        signals=email
+    )
+    return category
+
+
+def build_unread_summary_reply(emails, email_summaries):
     summaries = []
     spoken_parts = []
 
-    for idx, email in enumerate(emails, start=1):
+    for idx, (email, summary) in enumerate(zip(emails, email_summaries), start=1):
         sender = email.get("from", "Unknown sender")
         subject = email.get("subject", "No Subject")
 
-        summary = summarize_email_logic(
-            body=email.get("body", ""),
-            sender=sender,
-            subject=subject,
-            attachments=email.get("attachment_text", "")
-        )
-
         summaries.append({
             "sender": sender,
             "subject": subject,
@@ -120,8 +194,116 @@ def get_unread_emails_summary():
     }
 
 
-def get_last_email_summary():
-    emails = get_unread_emails(max_results=1) or []
+async def get_unread_emails_summary(emails=None):
+    result, _ = await unread_emails_summary(emails)
+    return result
+
+
+async def unread_emails_summary(emails=None):
+    """
+    Returns:
+        (result, degraded); degraded when any summary is a fallback
+    """
+    if emails is None:
+        emails = await get_inbox_snapshot_async()
+
+    if not emails:
+        return {
+            "reply": "You have no unread emails.",
+            "data": None
+        }, False
+
+    # One LLM call per email, run in parallel under the shared rate limit
+    results = await amap_concurrent(summarize_email, emails)
+    email_summaries = [summary for summary, _ in results]
+    degraded = any(source == "fallback" for _, source in results)
+
+    return build_unread_summary_reply(emails, email_summaries), degraded
+
+
+async def stream_unread_emails_summary(stream_tokens=False):
+    """
+    Streaming variant of get_unread_emails_summary
+
+    Yields (event, data) pairs: "start" with the email count, a "summary"
+    per email in the order they finish (plus "token" deltas when
+    stream_tokens is set), then "done" with the same reply/data payload
+    the blocking endpoint returns.
+    """
+    emails = await get_inbox_snapshot_async()
+
+    if not emails:
+        yield "done", {
+            "reply": "You have no unread emails.",
+            "data": None
+        }
+        return
+
+    yield "start", {"email_count": len(emails)}
+
+    events = asyncio.Queue()
+    semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+    async def summarize(idx):
+        email = emails[idx - 1]
+        on_token = None
+        if stream_tokens:
+            on_token = lambda delta: events.put_nowait(("token", {"index": idx, "delta": delta}))
+
+        try:
+            async with semaphore:
+                summary, _ = await summarize_email(email, on_token=on_token)
+        except Exception:
+            logger.exception("summary failed", extra={"message_id": email.get("id")})
+            summary = "I couldn't summarize this email."
+
+        events.put_nowait(("summary", {
+            "index": idx,
+            "sender": email.get("from", "Unknown sender"),
+            "subject": email.get("subject", "No Subject"),
+            "summary": summary
+        }))
+
+    email_summaries = [None] * len(emails)
+    tasks = [asyncio.create_task(summarize(idx)) for idx in range(1, len(emails) + 1)]
+    try:
+        remaining = len(emails)
+        while remaining:
+            event, data = await events.get()
+            if event == "summary":
+                email_summaries[data["index"] - 1] = data["summary"]
+                remaining -= 1
+            yield event, data
+    finally:
+        # A disconnected client cancels every summary still in progress
+        for task in tasks:
+            task.cancel()
+
+    yield "done", build_unread_summary_reply(emails, email_summaries)
+
+
+def sse_response(events):
+    """
+    Serve (event, data) pairs as text/event-stream
+    """
+    async def body():
+        try:
+            async for event, data in events:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception:
+            logger.exception("event stream failed")
+            yield f"event: error\ndata: {json.dumps({'detail': 'Streaming failed'})}\n\n"
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def get_last_email_summary(emails=None):
+    if emails is None:
+        emails = await get_inbox_snapshot_async(max_results=1)
 
     if not emails:
         return {
@@ -131,27 +313,36 @@ def get_last_email_summary():
 
     email = emails[0]
 
+    # Summary and category are independent LLM calls; run them together
+    (summary, _), category = await asyncio.gather(
+        summarize_email(email),
+        categorize_email(email)
+    )
+
     return {
-        "reply": summarize_email_logic(
-            body=email.get("body", ""),
-            sender=email.get("from", "Unknown sender"),
-            subject=email.get("subject", ""),
-            attachments=email.get("attachment_text", "")
-        ),
+        "reply": summary,
         "data": {
             "sender": email.get("from"),
-            "category": get_email_category(
-                email.get("body", ""),
-                email.get("from", ""),
-                email.get("subject", "")
-            ),
+            "category": category,
             "has_attachments": bool(email.get("attachment_text"))
         }
     }
 
 
-def get_unread_email_categories():
-    emails = get_unread_emails() or []
+async def get_unread_email_categories(emails=None):
+    result, _ = await unread_email_categories(emails)
+    return result
+
+
+async def unread_email_categories(emails=None):
+    """
+    Returns:
+        (result, degraded); degraded when any category is a fallback
+    """
+    if emails is None:
+        emails = await get_inbox_snapshot_async()
+    # One structured LLM call per batch instead of one call per email
+    categories, tiers = await get_email_categories_and_tiers_async(emails)
 
     return {
         "reply": f"I found {len(emails)} unread emails with categories.",
@@ -161,77 +352,412 @@ def get_unread_email_categories():
                 {
                     "sender": email.get("from", ""),
                     "subject": email.get("subject", "No Subject"),
-                    "category": get_email_category(
-                        email.get("body", ""),
-                        email.get("from", ""),
-                        email.get("subject", "")
-                    )
+                    "category": category
                 }
-                for email in emails
+                for email, category in zip(emails, categories)
             ]
         }
-    }
+    }, "fallback" in tiers
 
-# ============================ COMMAND ROUTER ============================
-@app.post("/command")
-def handle_command(payload: CommandPayload):
-    try:
-        command = payload.command.strip().lower()
+# ============================ PREFETCH ============================
+# Fill the summary and category caches the tools above read from; each
+# reports what fell back so the worker retries it on a later poll
 
-        # 🔍 RULE-BASED: sender lookup (FAST, NO LLM)
-        if ("email from" in command) or ("emails from" in command):
-            sender_query = command.split("from")[-1]
-            sender_query = re.sub(r"[^\w\s@.]", "", sender_query).strip()
+async def precompute_summary(email):
+    _, source = await summarize_email(email)
+    return source == "fallback"
 
-            if not sender_query:
-                return {
-                    "reply": "Whose emails should I check?",
-                    "data": None
-                }
 
-            return check_emails_from_sender(sender_query)
+async def precompute_categories(emails):
+    # One batched call for the whole new set, as the categories tool does
+    _, tiers = await get_email_categories_and_tiers_async(emails)
+    return [email["id"] for email, tier in zip(emails, tiers) if tier == "fallback"]
+
+
+prefetch_worker = PrefetchWorker(process=precompute_summary, process_batch=precompute_categories)
+
 
-        # 🧠 LLM-BASED SAFE COMMANDS
-        function_map = {
-            "get_unread_emails_summary": get_unread_emails_summary,
-            "get_last_email_summary": get_last_email_summary,
-            "get_unread_email_categories": get_unread_email_categories
+def with_freshness(result):
+    """
+    Tell the client how current the answer is: when the inbox view was
+    fetched and when the background worker last precomputed anything
+    """
+    return {
+        **result,
+        "freshness": {
+            "inbox_as_of": get_inbox_snapshots().fetched_at,
+            "prefetched_at": prefetch_worker.last_processed_at
         }
+    }
 
-        # 🔁 FOLLOW-UP shortcut (NO LLM)
-        if command in ["summarize them", "summarize", "summarise them"]:
-            return get_unread_emails_summary()
+# ============================ CONDITIONAL REQUESTS ============================
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # Weak comparison, as If-None-Match requires
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+# Reply last served under each inbox-view ETag, so a 304 can still be
+# recorded as the turn it answers
+VIEW_REPLY_ENTRIES = 128
+_view_replies = OrderedDict()
+
+
+def remember_view_reply(etag: str, reply: str):
+    _view_replies[etag] = reply
+    _view_replies.move_to_end(etag)
+    while len(_view_replies) > VIEW_REPLY_ENTRIES:
+        _view_replies.popitem(last=False)
+
+
+async def conditional_inbox_response(request: Request, prompt_version: str, produce,
+                                     command: Optional[str] = None, session_id: Optional[str] = None):
+    """
+    Answer with 304 when the client already holds this view of the inbox
+
+    The ETag covers the mailbox historyId, the unread IDs and the prompt
+    version, so an unchanged inbox costs a profile call (plus a
+    messages.list when the ID snapshot has expired) and no LLM work.
+    It is weak: the freshness timestamps and regenerated LLM text make
+    two bodies for the same tag semantically equal, not byte-identical.
+
+    `produce` returns (result, degraded). A degraded answer (some item
+    fell back because the LLM failed) gets no ETag and is not stored, so
+    the next request retries instead of revalidating it.
+
+    With `command`, the view is a turn of the conversation: it is recorded
+    on the session (304s included) and the session ID comes back in the
+    X-Session-Id header, since a 304 has no body to carry it.
+    """
+    history_id, message_ids = await inbox_version()
+    etag = f'W/"{fingerprint(prompt_version, history_id, *message_ids)}"'
+    # The browser must revalidate every time; the 304 makes that cheap
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    sessions = get_session_store()
+    if command:
+        session_id, _ = sessions.open(session_id)
+        headers["X-Session-Id"] = session_id
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        # Only safe methods may be answered with 304 (RFC 9110 13.1.2)
+        if request.method != "GET":
+            return Response(status_code=412, headers=headers)
+
+        # A turn needs the reply text; without it (e.g. after a restart)
+        # send the full view instead
+        reply = _view_replies.get(etag)
+        if not command or reply is not None:
+            if command:
+                sessions.record(session_id, command, reply)
+            return Response(status_code=304, headers=headers)
+
+    result, degraded = await produce()
+    if degraded:
+        del headers["ETag"]
+        headers["Cache-Control"] = "no-store"
+    else:
+        remember_view_reply(etag, result["reply"])
+
+    if command:
+        sessions.record(session_id, command, result["reply"])
+        result = {**result, "session_id": session_id}
+
+    return JSONResponse(with_freshness(result), headers=headers)
 
+# ============================ COMMAND ROUTER ============================
+COMMAND_FUNCTIONS = {
+    "get_unread_emails_summary": get_unread_emails_summary,
+    "get_last_email_summary": get_last_email_summary,
+    "get_unread_email_categories": get_unread_email_categories,
+    "check_emails_from_sender": check_emails_from_sender
+}
+
+SUMMARIZE_FOLLOW_UPS = ["summarize them", "summarize", "summarise them"]
+
+# Served while the LLM provider is failing (circuit open or retries exhausted)
+LLM_UNAVAILABLE_REPLY = {
+    "reply": "I'm having trouble reaching my AI service right now. "
+             "You can still ask \"summarize them\" or for emails from a sender.",
+    "data": {"error": "llm_unavailable"}
+}
+
+
+def is_sender_lookup(command: str) -> bool:
+    return ("email from" in command) or ("emails from" in command)
+
+
+async def plan_command(command: str, history: list):
+    """
+    Pick the tools for a command: locally when the intent router is sure,
+    otherwise through an LLM tool-calling round whose choice the router
+    remembers
+
+    Returns:
+        (calls, response_message); calls is a list of (function_name, args),
+        empty when the LLM replied without a tool; response_message is None
+        when routed
+    """
+    router = get_intent_router()
+
+    routed = router.route(command, history)
+    if routed:
+        function_name, function_args, _ = routed
+        return [(function_name, function_args)], None
+
+    response_message = await aselect_tool_call(command, history)
+    calls = parse_tool_calls(response_message)
+
+    # Multi-tool answers are left to the LLM next time too
+    if len(calls) <= 1:
+        function_name, function_args = calls[0] if calls else (None, {})
+        # Learning occasionally saves the model to disk
+        await asyncio.to_thread(router.learn, command, function_name, function_args or {}, history)
+
+    return calls, response_message
+
+
+async def run_tool_calls(calls):
+    """
+    Run the planned tools concurrently against one inbox snapshot
+    """
+    functions = COMMAND_FUNCTIONS
+    if len(calls) > 1:
+        # Take the widest view once and hand it to every tool, so they all
+        # answer from the same inbox even if the snapshot cache is
+        # invalidated meanwhile
+        try:
+            emails = await get_inbox_snapshot_async()
+        except Exception:
+            # Each tool then fetches its own view and reports its own failure
+            logger.exception("shared inbox snapshot failed")
+        else:
+            functions = {
+                name: partial(function, emails=emails)
+                for name, function in COMMAND_FUNCTIONS.items()
+            }
+
+    return await arun_tools(calls, functions)
+
+
+async def run_command(raw_command: str, history: list):
+    command = raw_command.strip().lower()
 
-        result = intelligent_command_handler(payload.command, function_map, payload.history)
+    # 🔍 RULE-BASED: sender lookup (FAST, NO LLM)
+    if is_sender_lookup(command):
+        sender_query = command.split("from")[-1]
+        sender_query = re.sub(r"[^\w\s@.]", "", sender_query).strip()
 
-        # ✅ HARD RESPONSE NORMALIZATION (frontend expects this)
-        if isinstance(result, dict):
+        if not sender_query:
             return {
-                "reply": result.get("reply", ""),
-                "data": result.get("data")
+                "reply": "Whose emails should I check?",
+                "data": None
             }
 
+        return await check_emails_from_sender(sender_query)
+
+    # 🔁 FOLLOW-UP shortcut (NO LLM)
+    if command in SUMMARIZE_FOLLOW_UPS:
+        return await get_unread_emails_summary()
+
+    # 🧭 LOCAL INTENT ROUTER, LLM only when ambiguous
+    calls, response_message = await plan_command(raw_command, history)
+    if not calls:
+        result = await aexecute_tool_call(response_message, COMMAND_FUNCTIONS)
+    else:
+        result = await run_tool_calls(calls)
+
+    # ✅ HARD RESPONSE NORMALIZATION (frontend expects this)
+    if isinstance(result, dict):
         return {
-            "reply": str(result),
-            "data": None
+            "reply": result.get("reply", ""),
+            "data": result.get("data")
         }
 
+    return {
+        "reply": str(result),
+        "data": None
+    }
+
+
+@app.post("/command")
+async def handle_command(payload: CommandPayload):
+    sessions = get_session_store()
+    session_id, history = sessions.open(payload.session_id, payload.history)
+
+    try:
+        result = await run_command(payload.command, history)
+
+    except LLMUnavailable:
+        logger.warning("LLM unavailable", exc_info=True)
+        result = LLM_UNAVAILABLE_REPLY
+
     except Exception:
-        traceback.print_exc()
+        logger.exception("command failed")
         raise HTTPException(
             status_code=500,
             detail="Command processing failed"
         )
 
+    sessions.record(session_id, payload.command, result["reply"])
+    return with_freshness({**result, "session_id": session_id})
+
+
+async def _stream_command_events(raw_command: str, history: list, stream_tokens=False):
+    command = raw_command.strip().lower()
+
+    if is_sender_lookup(command):
+        yield "done", await run_command(raw_command, history)
+        return
+
+    if command in SUMMARIZE_FOLLOW_UPS:
+        async for event in stream_unread_emails_summary(stream_tokens):
+            yield event
+        return
+
+    try:
+        calls, response_message = await plan_command(raw_command, history)
+    except LLMUnavailable:
+        logger.warning("LLM unavailable", exc_info=True)
+        yield "done", LLM_UNAVAILABLE_REPLY
+        return
+
+    # Only a lone inbox summary is worth streaming; everything else is one event
+    if [name for name, _ in calls] == ["get_unread_emails_summary"]:
+        async for event in stream_unread_emails_summary(stream_tokens):
+            yield event
+        return
+
+    if not calls:
+        yield "done", await aexecute_tool_call(response_message, COMMAND_FUNCTIONS)
+    else:
+        yield "done", await run_tool_calls(calls)
+
+
+async def stream_command(payload: CommandPayload, stream_tokens=False):
+    sessions = get_session_store()
+    session_id, history = sessions.open(payload.session_id, payload.history)
+
+    async for event, data in _stream_command_events(payload.command, history, stream_tokens):
+        if event == "done":
+            sessions.record(session_id, payload.command, data["reply"])
+            data = with_freshness({**data, "session_id": session_id})
+        yield event, data
+
+
+@app.post("/command/stream")
+async def handle_command_stream(payload: CommandPayload, tokens: bool = False):
+    """
+    /command as server-sent events; summaries arrive one email at a time
+    (and token by token with ?tokens=true)
+    """
+    return sse_response(stream_command(payload, stream_tokens=tokens))
+
 # ============================ DIRECT ROUTES ============================
-@app.post("/summarize/unread")
-def summarize_unread_emails():
+@app.api_route("/summarize/unread", methods=["GET", "POST"])
+async def summarize_unread_emails(request: Request, command: Optional[str] = None,
+                                  session_id: Optional[str] = None):
     try:
-        return get_unread_emails_summary()
+        return await conditional_inbox_response(
+            request, SUMMARY_PROMPT_VERSION, unread_emails_summary, command, session_id
+        )
     except Exception:
-        traceback.print_exc()
+        logger.exception("summarize unread failed")
         raise HTTPException(
             status_code=500,
             detail="Failed to summarize unread emails"
         )
+
+
+@app.api_route("/categories/unread", methods=["GET", "POST"])
+async def categorize_unread_emails(request: Request, command: Optional[str] = None,
+                                   session_id: Optional[str] = None):
+    try:
+        return await conditional_inbox_response(
+            request, CATEGORY_PROMPT_VERSION, unread_email_categories, command, session_id
+        )
+    except Exception:
+        logger.exception("categorize unread failed")
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to categorize unread emails"
+        )
+
+
+@app.post("/summarize/unread/stream")
+async def summarize_unread_emails_stream(tokens: bool = False):
+    async def events():
+        async for event, data in stream_unread_emails_summary(stream_tokens=tokens):
+            yield event, with_freshness(data) if event == "done" else data
+
+    return sse_response(events())
+
+
+@app.post("/inbox/invalidate")
+async def invalidate_inbox():
+    invalidate_inbox_snapshots()
+    return {
+        "reply": "Inbox cache cleared.",
+        "data": None
+    }
+
+
+@app.post("/inbox/notify")
+async def inbox_notify():
+    """
+    Push hook (e.g. a Gmail Pub/Sub push subscription): new mail may have
+    arrived, so drop the cached views and let the prefetch worker poll now
+    """
+    invalidate_inbox_snapshots()
+    prefetch_worker.notify()
+    return {
+        "reply": "Inbox refresh scheduled.",
+        "data": {"prefetch": prefetch_worker.running}
+    }
+
+# ============================ ADMIN ============================
+@app.delete("/admin/summary-cache")
+def purge_summary_cache(kind: Optional[str] = None, message_id: Optional[str] = None):
+    """
+    Purge cached summaries/categories; all of them unless narrowed by
+    kind ("summary" or "category") and/or message_id
+    """
+    removed = get_summary_cache().purge(kind=kind, message_id=message_id)
+    return {
+        "reply": f"Removed {removed} cached entr{'y' if removed == 1 else 'ies'}.",
+        "data": {"removed": removed}
+    }
+
+# ============================ STATS ============================
+def cache_stats():
+    pool = get_extraction_pool()
+    return {
+        "message_cache": get_message_cache().stats(),
+        "extraction_cache": get_extraction_cache().stats(),
+        "extraction_pool": pool.stats() if pool else None,
+        "summary_cache": get_summary_cache().stats()
+    }
+
+
+@app.get("/stats")
+async def stats():
+    # On the event loop, like every handler that touches the async Gmail
+    # client; the caches' COUNT queries run in the executor
+    return {
+        **await asyncio.to_thread(cache_stats),
+        "inbox_snapshots": get_inbox_snapshots().stats(),
+        "gmail_http": get_async_gmail_client().stats(),
+        "prefetch": prefetch_worker.stats(),
+        "categorization": categorization_stats(),
+        "llm": llm_stats(),
+        "intent_router": get_intent_router().stats(),
+        "sessions": get_session_store().stats()
+    }
+
+
+@app.get("/metrics")
+def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
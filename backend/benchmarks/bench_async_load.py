@@ -0,0 +1,102 @@
+"""
+Concurrent /command requests against the async handler vs a blocking baseline.
+
+The app runs under uvicorn with the LLM clients replaced by fakes that take
+--llm-latency seconds per call. The baseline is the pre-async handler: a
+plain `def` endpoint making the tool-selection call on a blocking client, so
+each in-flight request holds one of Starlette's worker threads (40 by
+default).
+
+Server and load generator share one process, so on a small machine the
+async numbers are bounded by CPU rather than by the fake LLM.
+
+Usage (from backend/):
+    python -m benchmarks.bench_async_load [--requests 200] [--llm-latency 1.0]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+# Before the app is imported: no rate limiting, a throwaway router model
+os.environ.setdefault("GROQ_API_KEY", "bench")
+os.environ["LLM_REQUESTS_PER_MINUTE"] = "1000000"
+os.environ["LLM_TOKENS_PER_MINUTE"] = "1000000000"
+os.environ["INTENT_MODEL_PATH"] = os.path.join(tempfile.mkdtemp(), "intent_model.json")
+
+import httpx
+import uvicorn
+
+from benchmarks.fakes import FakeLLM
+from services import llm_client
+from services.backends import set_llm_backend
+from app import app, CommandPayload
+
+PORT = 8765
+
+fake_llm = FakeLLM()
+
+
+@app.post("/bench/command-sync")
+def blocking_command(payload: CommandPayload):
+    response = fake_llm.client.chat.completions.create(
+        **llm_client._tool_selection_request(payload.command, None)
+    )
+    message = response.choices[0].message
+    return {"reply": message.content or "I'm here to help with your emails!", "data": None}
+
+
+def start_server():
+    server = uvicorn.Server(uvicorn.Config(app, port=PORT, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+async def load(path, requests):
+    async def one(client, i):
+        start = time.perf_counter()
+        response = await client.post(path, json={"command": f"hello there number {i}"})
+        response.raise_for_status()
+        return time.perf_counter() - start
+
+    limits = httpx.Limits(max_connections=requests)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=120) as client:
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(one(client, i) for i in range(requests)))
+        return time.perf_counter() - start, sorted(latencies)
+
+
+def report(label, elapsed, latencies):
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:>10} {elapsed:>8.2f}s {len(latencies) / elapsed:>9.1f} "
+          f"{statistics.median(latencies):>8.2f}s {p95:>8.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200, help="concurrent requests per run")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="seconds per fake LLM call")
+    args = parser.parse_args()
+
+    fake_llm.latency = args.llm_latency
+    set_llm_backend(fake_llm.backend())
+
+    server, thread = start_server()
+    try:
+        print(f"{args.requests} concurrent chat commands, {args.llm_latency}s per LLM call")
+        print(f"{'handler':>10} {'wall':>9} {'req/s':>9} {'p50':>9} {'p95':>9}")
+        for label, path in (("blocking", "/bench/command-sync"), ("async", "/command")):
+            report(label, *asyncio.run(load(path, args.requests)))
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()
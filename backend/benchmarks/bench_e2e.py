@@ -0,0 +1,162 @@
+"""
+End-to-end latency of /command and /summarize/unread against offline fakes.
+
+The app is driven in-process (httpx ASGI transport) with the Gmail and LLM
+backends replaced by benchmarks.fakes, so results are repeatable and cost
+nothing. Each scenario starts from empty caches, sends --requests requests
+with at most --concurrency in flight, and reports latency percentiles,
+throughput and the upstream Gmail/LLM calls made per request.
+
+Usage (from backend/):
+    python -m benchmarks.bench_e2e [--requests 50] [--concurrency 10]
+        [--gmail-latency 0.05] [--llm-latency 0.4] [--copies 1]
+        [--scenario summarize ...] [--json results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+# Before the app is imported: throwaway caches and models, and a rate
+# limit high enough that it doesn't hide the code being measured
+_state = tempfile.mkdtemp(prefix="inboxai-bench-")
+for name, file_name in (("MESSAGE_CACHE_PATH", "messages.db"),
+                        ("SUMMARY_CACHE_PATH", "summaries.db"),
+                        ("EXTRACTION_CACHE_PATH", "extractions.db"),
+                        ("LOCAL_MODEL_PATH", "category_model.json"),
+                        ("INTENT_MODEL_PATH", "intent_model.json")):
+    os.environ[name] = os.path.join(_state, file_name)
+os.environ.setdefault("LLM_REQUESTS_PER_MINUTE", "100000")
+os.environ.setdefault("LLM_TOKENS_PER_MINUTE", "100000000")
+
+import httpx
+
+from benchmarks.fakes import FakeGmailTransport, FakeLLM
+from services.backends import set_mail_backend, set_llm_backend
+from services.gmail_async import get_async_gmail_client
+from services.inbox_snapshot import invalidate_inbox_snapshots
+from services.message_cache import get_message_cache
+from services.summary_cache import get_summary_cache
+from ai_logic.readers.extraction_cache import get_extraction_cache
+from app import app
+
+
+def command(text):
+    return "POST", "/command", {"json": {"command": text}}
+
+
+SCENARIOS = {
+    "summarize": ("POST", "/summarize/unread", {}),
+    "summarize-etag": ("GET", "/summarize/unread", {"conditional": True}),
+    "categories": ("GET", "/categories/unread", {}),
+    "command-summary": command("summarize my inbox"),
+    "command-last": command("what's my latest email"),
+    "command-categories": command("show me the categories of my emails"),
+    "command-sender": command("do I have emails from northwind"),
+    "command-chat": command("hey, how is it going today?"),
+}
+
+
+def percentile(values, q):
+    # Nearest rank on sorted values
+    index = max(int(round(q / 100 * len(values) + 0.5)) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def reset_caches():
+    invalidate_inbox_snapshots()
+    get_async_gmail_client().inbox.reset()
+    get_summary_cache().purge()
+    get_message_cache().clear()
+    get_extraction_cache().clear()
+
+
+async def run_scenario(client, gmail, llm, scenario, requests, concurrency):
+    method, path, options = SCENARIOS[scenario]
+    reset_caches()
+
+    headers = {}
+    if options.get("conditional"):
+        # Revalidate the view a client fetched once before
+        response = await client.request(method, path)
+        headers["If-None-Match"] = response.headers.get("etag", "")
+
+    gmail_before, llm_before, tokens_before = gmail.total_calls, llm.calls, llm.total_tokens
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(method, path, headers=headers, json=options.get("json"))
+            statuses.append(response.status_code)
+            return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = sorted(await asyncio.gather(*(one() for _ in range(requests))))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "scenario": scenario,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": sum(1 for status in statuses if status >= 400),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "throughput_rps": requests / elapsed,
+        "gmail_calls_per_request": (gmail.total_calls - gmail_before) / requests,
+        "llm_calls_per_request": (llm.calls - llm_before) / requests,
+        "llm_tokens_per_request": (llm.total_tokens - tokens_before) / requests
+    }
+
+
+def report(results):
+    print(f"{'scenario':>20} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} "
+          f"{'gmail/req':>9} {'llm/req':>8} {'tok/req':>8} {'errors':>6}")
+    for r in results:
+        print(f"{r['scenario']:>20} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} "
+              f"{r['throughput_rps']:>8.1f} {r['gmail_calls_per_request']:>9.2f} "
+              f"{r['llm_calls_per_request']:>8.2f} {r['llm_tokens_per_request']:>8.0f} {r['errors']:>6}")
+
+
+async def run(args):
+    gmail = FakeGmailTransport(latency=args.gmail_latency, copies=args.copies)
+    llm = FakeLLM(latency=args.llm_latency)
+    set_mail_backend(gmail.backend())
+    set_llm_backend(llm.backend())
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        return [
+            await run_scenario(client, gmail, llm, scenario, args.requests, args.concurrency)
+            for scenario in args.scenario or SCENARIOS
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10, help="requests in flight at once")
+    parser.add_argument("--gmail-latency", type=float, default=0.05, help="seconds per Gmail call")
+    parser.add_argument("--llm-latency", type=float, default=0.4, help="seconds per LLM call")
+    parser.add_argument("--copies", type=int, default=1, help="repeat the fixture mailbox this many times")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="run only these scenarios (repeatable)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests per scenario, {args.concurrency} in flight, "
+          f"Gmail {args.gmail_latency}s, LLM {args.llm_latency}s per call; caches start empty")
+    results = asyncio.run(run(args))
+    report(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Compare sequential vs batched Gmail message fetches against a local fake server.
+
+Usage (from backend/):
+    python -m benchmarks.bench_gmail_fetch [--latency 0.02]
+"""
+import argparse
+import time
+
+from benchmarks.fake_gmail_server import FakeGmailServer
+from services.gmail_client import fetch_messages_batch, fetch_messages_sequential
+
+
+def run(count, latency):
+    server = FakeGmailServer(message_count=count, latency=latency).start()
+    try:
+        service = server.build_service()
+        ids = sorted(server.messages)
+        rows = []
+
+        for name, fetch in (("sequential", fetch_messages_sequential),
+                            ("batched", fetch_messages_batch)):
+            server.request_count = 0
+            start = time.perf_counter()
+            fetched = fetch(service, ids)
+            elapsed = time.perf_counter() - start
+            assert len(fetched) == count, f"{name} fetched {len(fetched)}/{count}"
+            rows.append((name, elapsed, server.request_count))
+
+        return rows
+    finally:
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="simulated round trip per HTTP request (seconds)")
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 100, 500])
+    args = parser.parse_args()
+
+    print(f"{'messages':>8} {'mode':>10} {'seconds':>9} {'http reqs':>9}")
+    for count in args.counts:
+        for name, elapsed, requests in run(count, args.latency):
+            print(f"{count:>8} {name:>10} {elapsed:>9.3f} {requests:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Tokens sent per email before and after prompt preprocessing, on the fixture corpus.
+
+"raw" is the old behaviour (first N characters of the body as extracted,
+markup and all); "clean" is prepare_body with the current token budget.
+
+Usage (from backend/):
+    python -m benchmarks.bench_prompt_tokens [--corpus benchmarks/fixtures/emails]
+"""
+import argparse
+import os
+import time
+
+from services.email_text import prepare_body, count_tokens
+from ai_logic.email import SUMMARY_BODY_TOKENS
+from services.email_categorizer import MAX_CATEGORY_BODY_TOKENS
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "fixtures", "emails")
+
+# Character cuts used before token budgets
+OLD_SUMMARY_CHARS = 2000
+OLD_CATEGORY_CHARS = 500
+
+
+def load_corpus(path):
+    corpus = []
+    for name in sorted(os.listdir(path)):
+        with open(os.path.join(path, name), encoding="utf-8") as f:
+            corpus.append((name, f.read()))
+    return corpus
+
+
+def measure(body, old_chars, budget, repeat):
+    raw_tokens = count_tokens(body[:old_chars])
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        cleaned, _ = prepare_body(body, budget)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    return raw_tokens, count_tokens(cleaned), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="runs per email when timing preprocessing")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+
+    for label, old_chars, budget in (("summary", OLD_SUMMARY_CHARS, SUMMARY_BODY_TOKENS),
+                                     ("category", OLD_CATEGORY_CHARS, MAX_CATEGORY_BODY_TOKENS)):
+        print(f"\n{label} prompts (raw[:{old_chars}] chars vs cleaned, {budget}-token budget)")
+        print(f"{'email':>20} {'raw tok':>8} {'clean tok':>9} {'saved':>7} {'clean ms':>9}")
+
+        total_raw = total_clean = 0
+        for name, body in corpus:
+            raw_tokens, clean_tokens, elapsed = measure(body, old_chars, budget, args.repeat)
+            total_raw += raw_tokens
+            total_clean += clean_tokens
+            saved = 1 - clean_tokens / raw_tokens if raw_tokens else 0.0
+            print(f"{name:>20} {raw_tokens:>8} {clean_tokens:>9} {saved:>7.0%} {elapsed * 1000:>9.2f}")
+
+        saved = 1 - total_clean / total_raw if total_raw else 0.0
+        print(f"{'total':>20} {total_raw:>8} {total_clean:>9} {saved:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
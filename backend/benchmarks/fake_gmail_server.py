@@ -0,0 +1,205 @@
+"""
+Minimal local stand-in for the Gmail REST API used by the benchmarks.
+
+Serves messages.list, messages.get, getProfile, history.list and the
+/batch endpoint with a fixed
+simulated network round trip per HTTP request, so fetch strategies can be
+compared without touching a real mailbox.
+"""
+import base64
+import json
+import threading
+import time
+from email.parser import Parser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+import httplib2
+
+MESSAGES_PATH = "/gmail/v1/users/me/messages"
+PROFILE_PATH = "/gmail/v1/users/me/profile"
+HISTORY_PATH = "/gmail/v1/users/me/history"
+
+
+def make_message(index):
+    body = f"Hello, this is benchmark message number {index}. " * 20
+    return {
+        "id": f"msg{index:05d}",
+        "threadId": f"thr{index:05d}",
+        "labelIds": ["UNREAD", "INBOX"],
+        "internalDate": str(1700000000000 + index * 1000),
+        "payload": {
+            "mimeType": "multipart/alternative",
+            "headers": [
+                {"name": "From", "value": f"Sender {index} <sender{index}@example.com>"},
+                {"name": "Subject", "value": f"Benchmark message {index}"},
+            ],
+            "parts": [
+                {
+                    "mimeType": "text/plain",
+                    "body": {
+                        "data": base64.urlsafe_b64encode(body.encode()).decode()
+                    }
+                }
+            ]
+        }
+    }
+
+
+class FakeGmailServer:
+    def __init__(self, message_count=10, latency=0.02, per_item_latency=0.001):
+        self.messages = {
+            msg["id"]: msg
+            for msg in (make_message(i) for i in range(message_count))
+        }
+        self.history_id = 1000
+        self.history = []  # list of (history_id, record)
+        self.latency = latency
+        self.per_item_latency = per_item_latency
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def build_service(self):
+        """
+        Build a googleapiclient service whose root URL (including the batch
+        endpoint) points at this server
+        """
+        document = json.loads(get_static_doc("gmail", "v1"))
+        document["rootUrl"] = self.url
+        return build_from_document(document, http=httplib2.Http())
+
+    # -------------------- mailbox mutations --------------------
+    def _record(self, record):
+        with self._lock:
+            self.history_id += 1
+            self.history.append((self.history_id, record))
+
+    def add_message(self, index):
+        message = make_message(index)
+        self.messages[message["id"]] = message
+        self._record({"messagesAdded": [{"message": {
+            "id": message["id"], "labelIds": list(message["labelIds"])
+        }}]})
+        return message["id"]
+
+    def mark_read(self, message_id):
+        self.messages[message_id]["labelIds"].remove("UNREAD")
+        self._record({"labelsRemoved": [{
+            "message": {"id": message_id}, "labelIds": ["UNREAD"]
+        }]})
+
+    # -------------------- request handling --------------------
+    def _list(self, query):
+        limit = int(query.get("maxResults", ["100"])[0])
+        labels = set(query.get("labelIds", []))
+        ids = [
+            i for i in sorted(self.messages, reverse=True)
+            if labels <= set(self.messages[i]["labelIds"])
+        ]
+        response = {
+            "messages": [{"id": i, "threadId": self.messages[i]["threadId"]} for i in ids[:limit]],
+            "resultSizeEstimate": len(ids[:limit])
+        }
+        if len(ids) > limit:
+            response["nextPageToken"] = "more"
+        return 200, response
+
+    def _profile(self):
+        return 200, {"emailAddress": "me@example.com", "historyId": str(self.history_id)}
+
+    def _history(self, query):
+        start = int(query["startHistoryId"][0])
+        records = [record for history_id, record in self.history if history_id > start]
+        return 200, {"history": records, "historyId": str(self.history_id)}
+
+    def _get(self, message_id):
+        message = self.messages.get(message_id)
+        if message is None:
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+        return 200, message
+
+    def _route(self, method, raw_path):
+        parsed = urlparse(raw_path)
+        if method == "GET" and parsed.path == MESSAGES_PATH:
+            return self._list(parse_qs(parsed.query))
+        if method == "GET" and parsed.path == PROFILE_PATH:
+            return self._profile()
+        if method == "GET" and parsed.path == HISTORY_PATH:
+            return self._history(parse_qs(parsed.query))
+        if method == "GET" and parsed.path.startswith(MESSAGES_PATH + "/"):
+            return self._get(parsed.path.rsplit("/", 1)[-1])
+        return 404, {"error": {"code": 404, "message": "Not Found"}}
+
+    def _batch(self, content_type, body):
+        message = Parser().parsestr(f"Content-Type: {content_type}\r\n\r\n" + body)
+        boundary = "batch_response_boundary"
+        out = []
+
+        for part in message.get_payload():
+            request_line = part.get_payload().split("\r\n", 1)[0].split("\n", 1)[0]
+            method, path, _ = request_line.split(" ", 2)
+            status, payload = self._route(method, path)
+            time.sleep(self.per_item_latency)
+
+            content_id = part["Content-ID"][1:-1]
+            out.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} OK\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{json.dumps(payload)}\r\n"
+            )
+
+        out.append(f"--{boundary}--\r\n")
+        return f"multipart/mixed; boundary={boundary}", "".join(out)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, content_type, body):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                with server._lock:
+                    server.request_count += 1
+                time.sleep(server.latency)
+                status, payload = server._route("GET", self.path)
+                self._send(status, "application/json", json.dumps(payload))
+
+            def do_POST(self):
+                with server._lock:
+                    server.request_count += 1
+                time.sleep(server.latency)
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length).decode("utf-8")
+                content_type, payload = server._batch(self.headers["Content-Type"], body)
+                self._send(200, content_type, payload)
+
+        return Handler
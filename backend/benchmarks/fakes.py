@@ -0,0 +1,310 @@
+"""
+Offline stand-ins for Gmail and the LLM, pluggable through services.backends.
+
+FakeGmailTransport is an httpx transport that serves the recorded payloads
+in fixtures/gmail (messages.list/get in every format, attachments.get,
+history.list and getProfile) after a simulated round trip. FakeLLM answers chat completions
+(plain, JSON, streamed and tool calls) after a configurable latency and
+keeps token accounts the way the provider would bill them.
+
+    from benchmarks.fakes import FakeGmailTransport, FakeLLM
+    from services.backends import set_mail_backend, set_llm_backend
+
+    set_mail_backend(FakeGmailTransport(latency=0.05).backend())
+    set_llm_backend(FakeLLM(latency=0.5).backend())
+"""
+import asyncio
+import copy
+import glob
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+from urllib.parse import urlparse, parse_qs
+
+import httpx
+
+from services.backends import LLMBackend, MailBackend
+from services.llm_client import estimate_tokens
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "gmail")
+
+FAKE_GMAIL_ROOT = "https://gmail.fake/"
+MESSAGES_PATH = "/gmail/v1/users/me/messages"
+PROFILE_PATH = "/gmail/v1/users/me/profile"
+HISTORY_PATH = "/gmail/v1/users/me/history"
+
+
+# ============================ GMAIL ============================
+
+def load_fixtures(path=DEFAULT_FIXTURES, copies=1):
+    """
+    Recorded messages, newest first; `copies` > 1 repeats the mailbox
+    under new IDs to simulate a bigger inbox
+    """
+    recorded = []
+    for file_path in sorted(glob.glob(os.path.join(path, "*.json"))):
+        with open(file_path, encoding="utf-8") as f:
+            recorded.append(json.load(f))
+
+    messages = []
+    for copy_index in range(copies):
+        for message in recorded:
+            message = copy.deepcopy(message)
+            if copy_index:
+                suffix = f"c{copy_index}"
+                message["id"] += suffix
+                message["threadId"] += suffix
+                message["internalDate"] = str(int(message["internalDate"]) - copy_index * 86400000)
+                message["attachments"] = {
+                    attachment_id + suffix: attachment
+                    for attachment_id, attachment in message["attachments"].items()
+                }
+                for part in message["payload"].get("parts", []):
+                    if part.get("body", {}).get("attachmentId"):
+                        part["body"]["attachmentId"] += suffix
+            messages.append(message)
+
+    messages.sort(key=lambda m: int(m["internalDate"]), reverse=True)
+    return messages
+
+
+class FakeGmailTransport(httpx.AsyncBaseTransport):
+    """
+    Serves recorded Gmail payloads to AsyncGmailClient without a network
+    """
+
+    def __init__(self, fixtures=DEFAULT_FIXTURES, latency=0.05, copies=1, history_id=1000):
+        self.messages = {m["id"]: m for m in load_fixtures(fixtures, copies)}
+        self.latency = latency
+        self.history_id = history_id
+        # Oldest startHistoryId history.list can replay; earlier ones get 404
+        self.first_history_id = history_id
+        self.history = []  # history records, oldest first
+        self.calls = Counter()  # endpoint -> requests served
+
+    def backend(self):
+        return MailBackend(FAKE_GMAIL_ROOT, lambda: "fake-token", transport=self, name="fake")
+
+    @property
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    def add_message(self, message):
+        """
+        Simulate new mail: the message becomes unread and the mailbox
+        historyId moves on
+        """
+        self.messages[message["id"]] = message
+        self.history_id += 1
+        self.history.append({
+            "id": str(self.history_id),
+            "messagesAdded": [{"message": {
+                "id": message["id"],
+                "threadId": message["threadId"],
+                "labelIds": message["labelIds"]
+            }}]
+        })
+
+    def mark_read(self, message_id):
+        message = self.messages[message_id]
+        message["labelIds"] = [label for label in message["labelIds"] if label != "UNREAD"]
+        self.history_id += 1
+        self.history.append({
+            "id": str(self.history_id),
+            "labelsRemoved": [{
+                "message": {"id": message_id, "threadId": message["threadId"], "labelIds": message["labelIds"]},
+                "labelIds": ["UNREAD"]
+            }]
+        })
+
+    async def handle_async_request(self, request):
+        await asyncio.sleep(self.latency)
+
+        path = request.url.path
+        params = parse_qs(urlparse(str(request.url)).query)
+
+        if path == PROFILE_PATH:
+            return self._json("profile", {"emailAddress": "me@example.com", "historyId": str(self.history_id)})
+
+        if path == MESSAGES_PATH:
+            return self._json("messages.list", self._list(params))
+
+        if path == HISTORY_PATH:
+            start = int(params["startHistoryId"][0])
+            if start < self.first_history_id:
+                return self._json("history.list", {"error": "history expired"}, 404)
+            records = [record for record in self.history if int(record["id"]) > start]
+            return self._json("history.list", {"history": records, "historyId": str(self.history_id)})
+
+        match = re.fullmatch(MESSAGES_PATH + r"/([^/]+)/attachments/([^/]+)", path)
+        if match:
+            message = self.messages.get(match.group(1))
+            attachment = message and message["attachments"].get(match.group(2))
+            if attachment is None:
+                return self._json("attachments.get", {"error": "not found"}, 404)
+            return self._json("attachments.get", attachment)
+
+        match = re.fullmatch(MESSAGES_PATH + r"/([^/]+)", path)
+        if match:
+            message = self.messages.get(match.group(1))
+            if message is None:
+                return self._json("messages.get", {"error": "not found"}, 404)
+            return self._json("messages.get", self._format(message, params))
+
+        return self._json("unknown", {"error": "not found"}, 404)
+
+    def _json(self, endpoint, payload, status=200):
+        self.calls[endpoint] += 1
+        return httpx.Response(status, json=payload)
+
+    def _list(self, params):
+        labels = set(params.get("labelIds", []))
+        max_results = int(params.get("maxResults", ["100"])[0])
+        matching = [
+            {"id": m["id"], "threadId": m["threadId"]}
+            for m in sorted(self.messages.values(), key=lambda m: int(m["internalDate"]), reverse=True)
+            if labels <= set(m["labelIds"])
+        ]
+        return {"messages": matching[:max_results], "resultSizeEstimate": len(matching)}
+
+    def _format(self, message, params):
+        message = {k: v for k, v in message.items() if k != "attachments"}
+        format = params.get("format", ["full"])[0]
+
+        if format == "minimal":
+            message.pop("payload", None)
+        elif format == "metadata":
+            wanted = {name.lower() for name in params.get("metadataHeaders", [])}
+            headers = message["payload"]["headers"]
+            message["payload"] = {
+                "mimeType": message["payload"]["mimeType"],
+                "headers": [h for h in headers if not wanted or h["name"].lower() in wanted]
+            }
+        return message
+
+
+# ============================ LLM ============================
+
+# Tool picked for a command by the fake's "reasoning", first match wins
+FAKE_TOOL_RULES = [
+    (re.compile(r"\bfrom\s+(?P<sender>\w+)"), "check_emails_from_sender"),
+    (re.compile(r"categor|label|classif"), "get_unread_email_categories"),
+    (re.compile(r"\b(last|latest|newest|recent)\b"), "get_last_email_summary"),
+    (re.compile(r"mail|inbox|unread|summar"), "get_unread_emails_summary"),
+]
+
+BATCH_ITEM_RE = re.compile(r"\[id (\d+)\]")
+SENDER_RE = re.compile(r"Email from: (.+)")
+
+
+class FakeLLM:
+    """
+    Chat-completions stand-in with per-call latency and token accounting.
+
+    Each call sleeps `latency` plus `per_token` for every completion
+    token. Prompt tokens are estimated like the rate limiter does;
+    `usage` on every response lets the limiter settle reservations.
+    """
+
+    def __init__(self, latency=0.5, per_token=0.0):
+        self.latency = latency
+        self.per_token = per_token
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+        self.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=self._create)))
+        self.async_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=self._acreate)))
+
+    def backend(self):
+        return LLMBackend(self.async_client, name="fake")
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens
+
+    # -------------------- answers --------------------
+    def _answer(self, kwargs):
+        """
+        Returns:
+            (content, tool_calls)
+        """
+        messages = kwargs.get("messages", [])
+        prompt = messages[-1]["content"] if messages else ""
+
+        if kwargs.get("tools"):
+            command = prompt.lower()
+            for pattern, name in FAKE_TOOL_RULES:
+                match = pattern.search(command)
+                if match:
+                    args = {"sender_query": match.group("sender")} if "sender" in pattern.groupindex else {}
+                    call = SimpleNamespace(
+                        id=f"call_{self.calls}",
+                        type="function",
+                        function=SimpleNamespace(name=name, arguments=json.dumps(args))
+                    )
+                    return None, [call]
+            return "Hi! I can summarize or sort your unread email.", None
+
+        if kwargs.get("response_format", {}).get("type") == "json_object":
+            return json.dumps({item: "Updates" for item in BATCH_ITEM_RE.findall(prompt)}), None
+
+        if "Categorize" in prompt:
+            return "Updates", None
+
+        sender = SENDER_RE.search(prompt)
+        sender = sender.group(1).strip() if sender else "someone"
+        return f"{sender} wrote about a few updates and asked for a quick reply.", None
+
+    def _account(self, kwargs, content):
+        prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in kwargs.get("messages", []))
+        completion_tokens = estimate_tokens(content or "")
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+        usage = SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens
+        )
+        return usage, self.latency + self.per_token * completion_tokens
+
+    def _response(self, content, tool_calls, usage):
+        message = SimpleNamespace(role="assistant", content=content, tool_calls=tool_calls)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=usage)
+
+    @staticmethod
+    def _chunks(content):
+        for piece in re.findall(r"\S+\s*", content or ""):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+    # -------------------- clients --------------------
+    def _create(self, timeout=None, **kwargs):
+        # Blocking client, for the pre-async baseline in bench_async_load
+        content, tool_calls = self._answer(kwargs)
+        usage, delay = self._account(kwargs, content)
+        time.sleep(delay)
+        return self._response(content, tool_calls, usage)
+
+    async def _acreate(self, timeout=None, **kwargs):
+        content, tool_calls = self._answer(kwargs)
+        usage, delay = self._account(kwargs, content)
+
+        if kwargs.get("stream"):
+            async def stream():
+                # Time to first token, then the rest spread over the pieces
+                pieces = list(self._chunks(content))
+                await asyncio.sleep(self.latency)
+                for chunk in pieces:
+                    await asyncio.sleep((delay - self.latency) / max(len(pieces), 1))
+                    yield chunk
+            return stream()
+
+        await asyncio.sleep(delay)
+        return self._response(content, tool_calls, usage)
@@ -0,0 +1,256 @@
+"""
+Build the recorded Gmail payloads served by benchmarks.fakes.FakeGmailTransport.
+
+Each fixture is a users.messages.get (format=full) resource for one of the
+bodies in fixtures/emails, plus an "attachments" map of attachmentId to
+users.messages.attachments.get resource. Attachments are small but real
+PDF, DOCX, XLSX and CSV files so the readers do their normal work.
+
+Usage (from backend/):
+    python -m benchmarks.fixtures.make_gmail_fixtures
+"""
+import base64
+import csv
+import hashlib
+import io
+import json
+import os
+
+import docx
+import openpyxl
+
+HERE = os.path.dirname(__file__)
+EMAILS_DIR = os.path.join(HERE, "emails")
+OUTPUT_DIR = os.path.join(HERE, "gmail")
+
+BASE_DATE = 1767254400000  # 2026-01-01T08:00:00Z, ms
+
+MESSAGES = [
+    {
+        "body": "newsletter.html",
+        "from": "Stride Weekly <news@stride.example.com>",
+        "subject": "This week at Stride: 5 runs to try before spring",
+        "labels": ["UNREAD", "INBOX", "CATEGORY_PROMOTIONS"],
+        "headers": {
+            "List-Unsubscribe": "<mailto:unsubscribe@stride.example.com>",
+            "Precedence": "bulk"
+        },
+        "attachments": []
+    },
+    {
+        "body": "receipt.html",
+        "from": "Northwind Store <orders@northwind.example.com>",
+        "subject": "Your order #10482 has shipped",
+        "labels": ["UNREAD", "INBOX", "CATEGORY_UPDATES"],
+        "headers": {},
+        "attachments": ["invoice.pdf"]
+    },
+    {
+        "body": "reply_chain.txt",
+        "from": "Marco Bianchi <marco@acme.example.com>",
+        "subject": "Re: Budget review on Thursday",
+        "labels": ["UNREAD", "INBOX"],
+        "headers": {},
+        "attachments": ["budget.xlsx"]
+    },
+    {
+        "body": "outlook_reply.html",
+        "from": "Dana Lee <dana@contoso.example.com>",
+        "subject": "RE: Q3 planning notes",
+        "labels": ["UNREAD", "INBOX"],
+        "headers": {},
+        "attachments": ["planning_notes.docx"]
+    },
+    {
+        "body": "plain_signature.txt",
+        "from": "Events Team <events@acme.example.com>",
+        "subject": "Offsite attendee list",
+        "labels": ["UNREAD", "INBOX"],
+        "headers": {},
+        "attachments": ["attendees.csv"]
+    },
+    {
+        "body": "short_note.txt",
+        "from": "Sam Ortiz <sam@example.org>",
+        "subject": "Lunch?",
+        "labels": ["UNREAD", "INBOX"],
+        "headers": {},
+        "attachments": []
+    },
+]
+
+MIME_TYPES = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".csv": "text/csv",
+}
+
+
+# ============================ ATTACHMENTS ============================
+
+def make_pdf(lines):
+    """
+    Single-page PDF with one text line per entry, built by hand so no
+    PDF writer is needed
+    """
+    text_ops = ["BT", "/F1 12 Tf", "72 720 Td", "14 TL"]
+    for line in lines:
+        escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        text_ops.append(f"({escaped}) Tj T*")
+    text_ops.append("ET")
+    stream = "\n".join(text_ops).encode("latin-1")
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
+
+
+def make_docx(paragraphs):
+    document = docx.Document()
+    document.add_heading("Q3 planning notes", level=1)
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+def make_xlsx(rows):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Budget"
+    for row in rows:
+        sheet.append(row)
+    out = io.BytesIO()
+    workbook.save(out)
+    return out.getvalue()
+
+
+def make_csv(rows):
+    out = io.StringIO()
+    csv.writer(out).writerows(rows)
+    return out.getvalue().encode("utf-8")
+
+
+ATTACHMENT_BUILDERS = {
+    "invoice.pdf": lambda: make_pdf([
+        "Northwind Store - Invoice 10482",
+        "Trail running shoes (1)  $129.00",
+        "Merino socks (3)  $36.00",
+        "Shipping  $0.00",
+        "Total  $165.00",
+    ]),
+    "budget.xlsx": lambda: make_xlsx([
+        ["Line item", "Q2 actual", "Q3 plan"],
+        ["Cloud hosting", 18400, 21000],
+        ["Contractors", 32000, 28000],
+        ["Events", 6500, 12000],
+        ["Total", 56900, 61000],
+    ]),
+    "planning_notes.docx": lambda: make_docx([
+        "Goals: ship the self-serve onboarding flow and cut p95 dashboard load time in half.",
+        "Risks: hiring for the data team is two months behind plan.",
+        "Decision: move the analytics migration to Q4.",
+    ]),
+    "attendees.csv": lambda: make_csv([
+        ["name", "team", "dietary"],
+        ["Priya Shah", "Product", "vegetarian"],
+        ["Marco Bianchi", "Product", ""],
+        ["Dana Lee", "Engineering", "gluten-free"],
+        ["Sam Ortiz", "Design", ""],
+    ]),
+}
+
+
+# ============================ MESSAGES ============================
+
+def b64(data):
+    return base64.urlsafe_b64encode(data).decode("ascii")
+
+
+def build_message(index, spec):
+    with open(os.path.join(EMAILS_DIR, spec["body"]), encoding="utf-8") as f:
+        body = f.read()
+
+    message_id = f"fx{index:04d}" + hashlib.sha1(spec["body"].encode()).hexdigest()[:8]
+    mime = "text/html" if spec["body"].endswith(".html") else "text/plain"
+    headers = [
+        {"name": "From", "value": spec["from"]},
+        {"name": "To", "value": "Priya Shah <priya@acme.example.com>"},
+        {"name": "Subject", "value": spec["subject"]},
+        {"name": "Date", "value": f"Thu, 1 Jan 2026 {8 + index:02d}:00:00 +0000"},
+    ] + [{"name": name, "value": value} for name, value in spec["headers"].items()]
+
+    parts = [{
+        "partId": "0",
+        "mimeType": mime,
+        "filename": "",
+        "headers": [{"name": "Content-Type", "value": f"{mime}; charset=UTF-8"}],
+        "body": {"size": len(body.encode()), "data": b64(body.encode())}
+    }]
+    attachments = {}
+
+    for number, filename in enumerate(spec["attachments"], start=1):
+        data = ATTACHMENT_BUILDERS[filename]()
+        attachment_id = f"att-{message_id}-{number}"
+        mime_type = MIME_TYPES[os.path.splitext(filename)[1]]
+        parts.append({
+            "partId": str(number),
+            "mimeType": mime_type,
+            "filename": filename,
+            "headers": [{"name": "Content-Type", "value": f'{mime_type}; name="{filename}"'}],
+            "body": {"attachmentId": attachment_id, "size": len(data)}
+        })
+        attachments[attachment_id] = {"size": len(data), "data": b64(data)}
+
+    return {
+        "id": message_id,
+        "threadId": message_id,
+        "labelIds": spec["labels"],
+        "snippet": " ".join(body.split())[:120],
+        "internalDate": str(BASE_DATE + index * 3600 * 1000),
+        "sizeEstimate": len(body) + sum(a["size"] for a in attachments.values()),
+        "payload": {
+            "partId": "",
+            "mimeType": "multipart/mixed",
+            "filename": "",
+            "headers": headers,
+            "body": {"size": 0},
+            "parts": parts
+        },
+        "attachments": attachments
+    }
+
+
+def main():
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    for index, spec in enumerate(MESSAGES):
+        message = build_message(index, spec)
+        path = os.path.join(OUTPUT_DIR, f"{message['id']}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(message, f, indent=1)
+        print(f"{path} ({len(message['attachments'])} attachment(s))")
+
+
+if __name__ == "__main__":
+    main()
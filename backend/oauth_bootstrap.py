@@ -1,20 +1,18 @@
 import os
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 
-SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
+from services.gmail_service import get_service_manager
 
-def get_gmail_service():
-    creds = Credentials(
-        token=None,
-        refresh_token=os.getenv("GMAIL_REFRESH_TOKEN"),
-        token_uri="https://oauth2.googleapis.com/token",
-        client_id=os.getenv("GOOGLE_CLIENT_ID"),
-        client_secret=os.getenv("GOOGLE_CLIENT_SECRET"),
-        scopes=SCOPES,
-    )
 
-    creds.refresh(Request())
+def get_gmail_credentials():
+    """
+    Gmail credentials from GMAIL_REFRESH_TOKEN / GOOGLE_CLIENT_* env vars,
+    for deployments that cannot run the interactive token.json flow.
 
-    return build("gmail", "v1", credentials=creds)
+    Refuses to start without GMAIL_REFRESH_TOKEN rather than falling back
+    to token.json. Served by the same process-wide manager the app's Gmail
+    backend uses, so the token is refreshed only when close to expiry.
+    """
+    if not os.getenv("GMAIL_REFRESH_TOKEN"):
+        raise RuntimeError("GMAIL_REFRESH_TOKEN is not set")
+
+    return get_service_manager().get_credentials()
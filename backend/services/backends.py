@@ -0,0 +1,87 @@
+import os
+import threading
+
+GMAIL_API_ROOT = os.getenv("GMAIL_API_ROOT", "https://gmail.googleapis.com/")
+
+
+class LLMBackend:
+    """
+    Where chat completions are sent: an async client exposing the
+    OpenAI-style chat.completions.create(timeout=..., **kwargs).
+
+    llm_client layers rate limiting, retries, hedging and the circuit
+    breaker on top, so an offline fake exercises the same request path.
+    """
+
+    def __init__(self, async_client, name="custom"):
+        self.async_client = async_client
+        self.name = name
+
+
+class MailBackend:
+    """
+    Where Gmail REST calls are sent: the API root, a bearer token source
+    and optionally an httpx async transport (None means the network).
+    """
+
+    def __init__(self, root_url, get_token, transport=None, name="custom"):
+        self.root_url = root_url
+        self.get_token = get_token
+        self.transport = transport
+        self.name = name
+
+
+def groq_backend():
+    # Imported here so nothing talks to (or configures) Groq until first use
+    from groq import AsyncGroq
+
+    # Retries are handled by acreate_completion, not the SDK
+    return LLMBackend(AsyncGroq(api_key=os.getenv("GROQ_API_KEY"), max_retries=0), name="groq")
+
+
+def _gmail_token():
+    # Imported lazily so offline backends never load the Google auth stack
+    from services.gmail_service import get_service_manager
+
+    return get_service_manager().get_credentials().token
+
+
+def gmail_backend():
+    return MailBackend(GMAIL_API_ROOT, _gmail_token, name="gmail")
+
+
+_llm_backend = None
+_mail_backend = None
+_lock = threading.Lock()
+
+
+def get_llm_backend():
+    global _llm_backend
+
+    if _llm_backend is None:
+        with _lock:
+            if _llm_backend is None:
+                _llm_backend = groq_backend()
+
+    return _llm_backend
+
+
+def set_llm_backend(backend):
+    global _llm_backend
+    _llm_backend = backend
+
+
+def get_mail_backend():
+    global _mail_backend
+
+    if _mail_backend is None:
+        with _lock:
+            if _mail_backend is None:
+                _mail_backend = gmail_backend()
+
+    return _mail_backend
+
+
+def set_mail_backend(backend):
+    global _mail_backend
+    _mail_backend = backend
@@ -1,23 +1,348 @@
-from services.llm_client import call_llm
+import os
+import re
+import json
+import asyncio
+import threading
 
-MAX_CATEGORY_BODY_CHARS = 500
+from services.llm_client import (
+    acall_llm,
+    amap_concurrent,
+    estimate_tokens,
+    LLMUnavailable,
+    MODEL,
+    SUMMARIZER_SYSTEM_PROMPT
+)
+from services.summary_cache import get_summary_cache, fingerprint
+from services.sender_rules import categorize_by_sender, categorize_by_headers
+from services.local_classifier import get_local_model
+from services.email_text import prepare_body, CLEANING_VERSION
+from services.metrics import timed
 
-def get_email_category(body: str, sender: str, subject: str = "") -> str:
+MAX_CATEGORY_BODY_TOKENS = 125
+
+ALLOWED_CATEGORIES = {"Primary", "Promotions", "Social", "Spam", "Updates"}
+
+CATEGORY_PROMPT = (
+    "Categorize the email into ONE category:\n"
+    "Primary, Promotions, Social, Spam, Updates\n\n"
+    "Sender: {sender}\n"
+    "Subject: {subject}\n"
+    "Body: {body}\n\n"
+    "Respond with ONLY the category name."
+)
+
+CATEGORY_BATCH_PROMPT = (
+    "Categorize each email below into ONE category:\n"
+    "Primary, Promotions, Social, Spam, Updates\n\n"
+    "{emails}\n\n"
+    "Respond with ONLY a JSON object mapping every email id to its category, "
+    "for example {{\"1\": \"Updates\", \"2\": \"Primary\"}}."
+)
+
+CATEGORY_BATCH_ITEM = "[id {id}]\nSender: {sender}\nSubject: {subject}\nBody: {body}\n"
+
+# Batch categorization packs many emails into one prompt. Keep each
+# batch well inside the model's context (and the per-minute token budget).
+CATEGORY_BATCH_MAX_TOKENS = int(os.getenv("CATEGORY_BATCH_MAX_TOKENS", 3000))
+CATEGORY_BATCH_MAX_ITEMS = int(os.getenv("CATEGORY_BATCH_MAX_ITEMS", 25))
+CATEGORY_BATCH_RETRIES = 2
+
+# Single and batch prompts share cache entries, so both templates version them
+CATEGORY_PROMPT_VERSION = fingerprint(
+    CATEGORY_PROMPT,
+    CATEGORY_BATCH_PROMPT,
+    CATEGORY_BATCH_ITEM,
+    SUMMARIZER_SYSTEM_PROMPT,
+    MODEL,
+    str(CLEANING_VERSION),
+    str(MAX_CATEGORY_BODY_TOKENS)
+)
+
+
+def _trim_body(body):
     # Trim body aggressively (categorization does NOT need more)
-    if body and len(body) > MAX_CATEGORY_BODY_CHARS:
-        body = body[:MAX_CATEGORY_BODY_CHARS] + "..."
+    body, truncated = prepare_body(body, MAX_CATEGORY_BODY_TOKENS)
+    return body + "..." if truncated else body
+
+
+def _normalize_category(value):
+    if not isinstance(value, str):
+        return None
+    value = value.strip().strip(".").capitalize()
+    return value if value in ALLOWED_CATEGORIES else None
+
+
+# ============================ LOCAL TIERS ============================
+
+TIERS = ("cache", "sender_rule", "header", "local_model", "llm", "fallback")
+
+_tier_counts = {tier: 0 for tier in TIERS}
+_tier_lock = threading.Lock()
+
+
+def _count_tier(tier, n=1):
+    with _tier_lock:
+        _tier_counts[tier] += n
+
+
+def categorize_locally(email):
+    """
+    Try the cheap tiers in order: sender rules, header/label signals, then
+    the incrementally trained local model (only when confident)
+
+    Returns:
+        (category, tier) or (None, None) when the LLM is needed
+    """
+    category = categorize_by_sender(email.get("from", ""))
+    if category:
+        return category, "sender_rule"
+
+    category = categorize_by_headers(email)
+    if category:
+        return category, "header"
+
+    category = get_local_model().classify(email)
+    if category:
+        return category, "local_model"
+
+    return None, None
+
+
+def fallback_category(email):
+    """
+    Best local guess when the LLM can't answer: the local model's top
+    class regardless of confidence, else Primary
+    """
+    category, _ = get_local_model().predict(email)
+    return category or "Primary"
+
+
+def categorization_stats():
+    with _tier_lock:
+        counts = dict(_tier_counts)
+
+    total = sum(counts.values())
+    return {
+        "counts": counts,
+        "share": {tier: (count / total if total else 0.0) for tier, count in counts.items()},
+        "local_model_examples": get_local_model().examples
+    }
+
+
+def _categorize_without_llm(email, cache_id, content_hash):
+    """
+    The cached answer, else the local tiers; SQLite and the local model
+    make this blocking work, so callers run it in an executor
+
+    Returns:
+        (category, tier) or (None, None) when the LLM is needed
+    """
+    cached = get_summary_cache().get("category", cache_id, content_hash, CATEGORY_PROMPT_VERSION)
+    if cached is not None:
+        _count_tier("cache")
+        return cached, "cache"
+
+    category, tier = categorize_locally(email)
+    if category:
+        _count_tier(tier)
+    return category, tier
+
+
+def _remember_category(email, cache_id, content_hash, category):
+    _count_tier("llm")
+    get_summary_cache().put("category", cache_id, content_hash, CATEGORY_PROMPT_VERSION, category)
+    get_local_model().learn(email, category)
+
+
+async def get_email_category_and_tier_async(body: str, sender: str, subject: str = "",
+                                            message_id: str = None, signals: dict = None):
+    """
+    Categorize one email on the async LLM client. `signals` may carry the
+    parsed email's labels / list_unsubscribe / precedence fields for the
+    header tier.
+
+    Returns:
+        (category, tier); tier "fallback" means the LLM could not answer
+        and the category is a guess that was not cached
+    """
+    content_hash = fingerprint(sender, subject, body)
+    cache_id = message_id or content_hash
+    email = {**(signals or {}), "from": sender, "subject": subject, "body": body}
+
+    category, tier = await asyncio.to_thread(_categorize_without_llm, email, cache_id, content_hash)
+    if category:
+        return category, tier
+
+    def build_prompt():
+        with timed("prompt.category"):
+            return CATEGORY_PROMPT.format(sender=sender, subject=subject, body=_trim_body(body))
 
-    prompt = (
-        "Categorize the email into ONE category:\n"
-        "Primary, Promotions, Social, Spam, Updates\n\n"
-        f"Sender: {sender}\n"
-        f"Subject: {subject}\n"
-        f"Body: {body}\n\n"
-        "Respond with ONLY the category name."
-    )
+    prompt = await asyncio.to_thread(build_prompt)
 
-    category = call_llm(prompt).strip()
+    try:
+        category = (await acall_llm(prompt, stage="llm.category")).strip()
+    except LLMUnavailable:
+        _count_tier("fallback")
+        return await asyncio.to_thread(fallback_category, email), "fallback"
 
     # Safety net (LLMs can be creative when bored)
-    allowed = {"Primary", "Promotions", "Social", "Spam", "Updates"}
-    return category if category in allowed else "Primary"
+    if category not in ALLOWED_CATEGORIES:
+        _count_tier("fallback")
+        return "Primary", "fallback"
+
+    await asyncio.to_thread(_remember_category, email, cache_id, content_hash, category)
+    return category, "llm"
+
+
+# ============================ BATCH CATEGORIZATION ============================
+
+def _split_batches(items):
+    """
+    Group (index, prompt_entry) pairs so each batch stays under the token
+    and item caps
+    """
+    batches = []
+    current = []
+    current_tokens = estimate_tokens(CATEGORY_BATCH_PROMPT)
+
+    for index, entry in items:
+        tokens = estimate_tokens(entry)
+        if current and (current_tokens + tokens > CATEGORY_BATCH_MAX_TOKENS
+                        or len(current) >= CATEGORY_BATCH_MAX_ITEMS):
+            batches.append(current)
+            current = []
+            current_tokens = estimate_tokens(CATEGORY_BATCH_PROMPT)
+        current.append((index, entry))
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+
+    return batches
+
+
+async def _categorize_batch(batch):
+    """
+    One LLM call for a batch
+
+    Returns:
+        dict of index -> category for the items that came back valid,
+        or None when the LLM is unavailable
+    """
+    prompt = CATEGORY_BATCH_PROMPT.format(emails="\n".join(entry for _, entry in batch))
+
+    try:
+        raw = await acall_llm(prompt, max_tokens=12 * len(batch) + 32, json_mode=True, stage="llm.category_batch")
+        match = re.search(r"\{.*\}", raw, re.DOTALL)
+        mapping = json.loads(match.group(0)) if match else {}
+    except LLMUnavailable:
+        return None
+    except Exception:
+        return {}
+
+    if not isinstance(mapping, dict):
+        return {}
+
+    results = {}
+    for index, _ in batch:
+        category = _normalize_category(mapping.get(str(index + 1)))
+        if category:
+            results[index] = category
+
+    return results
+
+
+def _batch_entries(emails, pending):
+    with timed("prompt.category"):
+        return [
+            (index, CATEGORY_BATCH_ITEM.format(
+                id=index + 1,
+                sender=emails[index].get("from", ""),
+                subject=emails[index].get("subject", ""),
+                body=_trim_body(emails[index].get("body", ""))
+            ))
+            for index in pending
+        ]
+
+
+def _lookup_all(emails):
+    """
+    _categorize_without_llm for every email in one executor hop
+
+    Returns:
+        (categories, tiers, keys); None where the LLM is needed
+    """
+    categories = []
+    tiers = []
+    keys = []
+
+    for email in emails:
+        content_hash = fingerprint(email.get("from", ""), email.get("subject", ""), email.get("body", ""))
+        cache_id = email.get("id") or content_hash
+        keys.append((cache_id, content_hash))
+
+        category, tier = _categorize_without_llm(email, cache_id, content_hash)
+        categories.append(category)
+        tiers.append(tier)
+
+    return categories, tiers, keys
+
+
+def _remember_all(emails, keys, answered):
+    for index, category in answered.items():
+        _remember_category(emails[index], *keys[index], category)
+
+
+def _fallback_all(emails, pending):
+    _count_tier("fallback", len(pending))
+    return {index: fallback_category(emails[index]) for index in pending}
+
+
+async def get_email_categories_and_tiers_async(emails):
+    """
+    Categorize many emails with as few LLM calls as possible
+
+    Cached answers are reused and the local tiers (sender rules, header
+    signals, local model) answer what they can; the rest are packed into
+    JSON-answering batch prompts (split to fit the context window, sent
+    concurrently on the async client). Items missing or invalid in a
+    reply are retried on their own in a smaller batch, and anything
+    still unresolved (or everything, once the LLM is unavailable) falls
+    back to the local guess.
+
+    Returns:
+        (categories, tiers), both in the same order as `emails`
+    """
+    categories, tiers, keys = await asyncio.to_thread(_lookup_all, emails)
+    pending = [index for index, category in enumerate(categories) if category is None]
+
+    for attempt in range(CATEGORY_BATCH_RETRIES + 1):
+        if not pending:
+            break
+
+        entries = await asyncio.to_thread(_batch_entries, emails, pending)
+
+        answered = {}
+        unavailable = False
+        for results in await amap_concurrent(_categorize_batch, _split_batches(entries)):
+            if results is None:
+                unavailable = True
+                continue
+            answered.update(results)
+
+        for index, category in answered.items():
+            categories[index] = category
+            tiers[index] = "llm"
+        await asyncio.to_thread(_remember_all, emails, keys, answered)
+
+        pending = [index for index in pending if categories[index] is None]
+        if unavailable:
+            break
+
+    if pending:
+        guesses = await asyncio.to_thread(_fallback_all, emails, pending)
+        for index, category in guesses.items():
+            categories[index] = category
+            tiers[index] = "fallback"
+
+    return categories, tiers
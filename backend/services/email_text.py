@@ -0,0 +1,174 @@
+import re
+
+from bs4 import BeautifulSoup
+
+# Bump when cleaning changes so prompt fingerprints (and cached LLM
+# answers) follow
+CLEANING_VERSION = 2
+
+# Roughly how a BPE tokenizer splits English: short word chunks and
+# individual punctuation marks. Close enough to budget prompts without
+# shipping the model's tokenizer.
+TOKEN_PIECE_RE = re.compile(r"\w{1,4}|[^\w\s]")
+
+HTML_TAG_RE = re.compile(r"<\s*(html|body|div|p|table|br|span|a)\b", re.IGNORECASE)
+DROP_TAGS = ["script", "style", "head", "title", "meta", "noscript", "img", "svg"]
+BLOCK_TAGS = ["p", "div", "br", "tr", "li", "h1", "h2", "h3", "h4", "h5", "h6", "table"]
+
+URL_RE = re.compile(r"<?(?:https?://|www\.)\S+>?", re.IGNORECASE)
+MAILTO_RE = re.compile(r"\bmailto:\S+", re.IGNORECASE)
+
+# Where a quoted reply chain starts; everything from here on is dropped
+QUOTE_START_RES = [
+    re.compile(r"^\s*On .{0,200}wrote:\s*$", re.IGNORECASE),
+    re.compile(r"^\s*-{2,}\s*Original Message\s*-{2,}\s*$", re.IGNORECASE),
+    re.compile(r"^_{10,}\s*$"),
+]
+
+# Outlook-style quoted header: "From: ..." followed shortly by Sent/Date/To
+QUOTE_HEADER_RE = re.compile(r"^\s*From:\s.+$", re.IGNORECASE)
+QUOTE_HEADER_FOLLOW_RE = re.compile(r"^\s*(Sent|Date|To):\s", re.IGNORECASE)
+
+# Where a signature starts
+SIGNATURE_START_RES = [
+    re.compile(r"^--\s*$"),
+    re.compile(r"^\s*Sent from my \w+", re.IGNORECASE),
+    re.compile(r"^\s*Get Outlook for \w+", re.IGNORECASE),
+]
+
+# Newsletter footer lines that never help a summary
+BOILERPLATE_RE = re.compile(
+    r"unsubscribe|view (this email )?in (your )?browser|manage (your )?(email )?preferences"
+    r"|you are receiving this|all rights reserved",
+    re.IGNORECASE
+)
+# Footer lines are short; a longer line is a paragraph that merely
+# mentions one of the phrases and is kept
+BOILERPLATE_MAX_CHARS = 120
+
+
+def count_tokens(text: str) -> int:
+    return len(TOKEN_PIECE_RE.findall(text or ""))
+
+
+def truncate_to_tokens(text: str, max_tokens: int):
+    """
+    Cut text to at most max_tokens, ending on a word boundary
+
+    Returns:
+        (text, truncated)
+    """
+    if not text:
+        return text, False
+
+    end = None
+    for count, match in enumerate(TOKEN_PIECE_RE.finditer(text), start=1):
+        if count > max_tokens:
+            end = match.start()
+            break
+
+    if end is None:
+        return text, False
+
+    cut = text[:end]
+    boundary = max(cut.rfind(" "), cut.rfind("\n"))
+    if boundary > len(cut) // 2:
+        cut = cut[:boundary]
+    return cut.rstrip(), True
+
+
+def looks_like_html(text: str) -> bool:
+    return bool(HTML_TAG_RE.search(text[:2000]))
+
+
+def html_to_text(html: str) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+
+    for tag in soup(DROP_TAGS):
+        tag.decompose()
+
+    # Gmail and Outlook wrap quoted replies in these; drop them here
+    # while the structure is still available
+    for tag in soup.select("blockquote, div.gmail_quote, div#appendonsend, div.gmail_signature"):
+        tag.decompose()
+
+    for tag in soup(BLOCK_TAGS):
+        tag.insert_before("\n")
+        tag.insert_after("\n")
+
+    for tag in soup(["td", "th"]):
+        tag.insert_after(" ")
+
+    return soup.get_text()
+
+
+def _starts_quote(lines, idx):
+    line = lines[idx]
+    if any(r.match(line) for r in QUOTE_START_RES):
+        return True
+
+    return bool(QUOTE_HEADER_RE.match(line)) and any(
+        QUOTE_HEADER_FOLLOW_RE.match(following) for following in lines[idx + 1:idx + 4]
+    )
+
+
+def strip_quotes_and_signature(text: str) -> str:
+    lines = text.splitlines()
+    kept = []
+    seen_content = False
+
+    for idx, line in enumerate(lines):
+        if line.lstrip().startswith(">"):
+            continue
+
+        # Only once some content was kept, so a bare forward keeps its body
+        if seen_content and _starts_quote(lines, idx):
+            break
+
+        if any(r.match(line) for r in SIGNATURE_START_RES):
+            break
+
+        if len(line.strip()) <= BOILERPLATE_MAX_CHARS and BOILERPLATE_RE.search(line):
+            continue
+
+        kept.append(line)
+        seen_content = seen_content or bool(line.strip())
+
+    return "\n".join(kept)
+
+
+def clean_body(text: str) -> str:
+    """
+    Reduce an email body to the text worth sending to the LLM
+
+    HTML is converted to text, then links, quoted reply chains,
+    signatures and newsletter footers are removed and whitespace is
+    collapsed (paragraph breaks are kept).
+    """
+    if not text:
+        return ""
+
+    if looks_like_html(text):
+        text = html_to_text(text)
+
+    text = URL_RE.sub("", text)
+    text = MAILTO_RE.sub("", text)
+    # Zero-width spacers pad newsletter preheaders
+    text = re.sub("[\u200b\u200c\u200d\ufeff]", "", text).replace("\xa0", " ")
+
+    text = strip_quotes_and_signature(text)
+
+    text = re.sub(r"[ \t\r\f\v]+", " ", text)
+    text = re.sub(r" *\n *", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def prepare_body(text: str, max_tokens: int):
+    """
+    clean_body followed by a token budget
+
+    Returns:
+        (text, truncated)
+    """
+    return truncate_to_tokens(clean_body(text), max_tokens)
@@ -0,0 +1,302 @@
+import os
+import base64
+import random
+import asyncio
+
+import httpx
+
+from services.gmail_client import (
+    FETCH_IDS,
+    FETCH_HEADERS,
+    FETCH_FULL,
+    FETCH_LEVELS,
+    METADATA_HEADERS,
+    attachment_parts,
+    make_attachment,
+    summarize_attachments,
+    build_email,
+    extract_body,
+    parse_metadata,
+)
+from services.inbox_sync import InboxSync
+from services.message_cache import get_message_cache
+from services.metrics import timed
+from services.backends import get_mail_backend, GMAIL_API_ROOT
+
+GMAIL_MAX_CONNECTIONS = int(os.getenv("GMAIL_MAX_CONNECTIONS", 100))
+# Parallel messages.get per inbox fetch; the pool is shared by all requests
+GMAIL_FETCH_CONCURRENCY = int(os.getenv("GMAIL_FETCH_CONCURRENCY", 20))
+GMAIL_HTTP_TIMEOUT = 30
+GMAIL_RETRIES = 3
+
+MESSAGES_PATH = "gmail/v1/users/me/messages"
+
+
+class AsyncGmailClient:
+    """
+    Gmail REST client on a pooled httpx.AsyncClient.
+
+    All requests share one keep-alive connection pool, so an inbox fetch
+    costs a handful of concurrent round trips on warm connections and an
+    awaiting request holds no thread. Credentials come from the
+    process-wide GmailServiceManager (refreshed off the event loop)
+    unless a MailBackend supplies its own token and transport.
+    """
+
+    def __init__(self, root_url=GMAIL_API_ROOT, get_token=None, transport=None,
+                 max_connections=GMAIL_MAX_CONNECTIONS, concurrency=GMAIL_FETCH_CONCURRENCY):
+        self.root_url = root_url.rstrip("/") + "/"
+        self._get_token = get_token or get_mail_backend().get_token
+        self._transport = transport
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections
+        )
+        self.concurrency = concurrency
+        self.inbox = InboxSync(self)
+        self._http = None
+        self.requests = 0
+        self.retries = 0
+
+    def _client(self):
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                base_url=self.root_url,
+                limits=self._limits,
+                timeout=GMAIL_HTTP_TIMEOUT,
+                transport=self._transport
+            )
+        return self._http
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def _get(self, path, params=None):
+        token = await asyncio.to_thread(self._get_token)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        for attempt in range(GMAIL_RETRIES + 1):
+            self.requests += 1
+            response = await self._client().get(path, params=params, headers=headers)
+
+            if response.status_code == 429 or response.status_code >= 500:
+                if attempt < GMAIL_RETRIES:
+                    self.retries += 1
+                    await asyncio.sleep(random.uniform(0, 0.5 * 2 ** attempt))
+                    continue
+
+            response.raise_for_status()
+            return response.json()
+
+    # -------------------- endpoints --------------------
+    async def list_unread(self, max_results=10):
+        """
+        Returns:
+            (message IDs newest first, True when that is every unread message)
+        """
+        with timed("gmail.list"):
+            results = await self._get(MESSAGES_PATH, {"labelIds": "UNREAD", "maxResults": max_results})
+        return [msg["id"] for msg in results.get("messages", [])], "nextPageToken" not in results
+
+    async def list_unread_ids(self, max_results=10):
+        message_ids, _ = await self.list_unread(max_results)
+        return message_ids
+
+    async def list_history(self, start_history_id, history_types, page_token=None):
+        params = {"startHistoryId": start_history_id, "historyTypes": history_types}
+        if page_token:
+            params["pageToken"] = page_token
+        with timed("gmail.history"):
+            return await self._get("gmail/v1/users/me/history", params)
+
+    async def get_message(self, message_id, format="full", metadata_headers=None):
+        params = {"format": format}
+        if metadata_headers:
+            params["metadataHeaders"] = metadata_headers
+        with timed("gmail.get"):
+            return await self._get(f"{MESSAGES_PATH}/{message_id}", params)
+
+    async def get_messages(self, message_ids, format="full", metadata_headers=None):
+        """
+        Fetch many messages concurrently; ones that fail are skipped
+
+        Returns:
+            dict of message_id -> message resource
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(message_id):
+            async with semaphore:
+                try:
+                    return message_id, await self.get_message(message_id, format, metadata_headers)
+                except httpx.HTTPError:
+                    return message_id, None
+
+        results = await asyncio.gather(*(fetch(message_id) for message_id in message_ids))
+        return {message_id: msg for message_id, msg in results if msg is not None}
+
+    async def get_messages_cached(self, message_ids):
+        """
+        get_messages, downloading full payloads only for messages the
+        message cache cannot serve (cached ones just need labels and dates)
+        """
+        cache = get_message_cache()
+        cached = {
+            message_id for message_id in message_ids
+            if await asyncio.to_thread(cache.contains, message_id)
+        }
+        minimal, full = await asyncio.gather(
+            self.get_messages([i for i in message_ids if i in cached], format="minimal"),
+            self.get_messages([i for i in message_ids if i not in cached])
+        )
+        return {**minimal, **full}
+
+    async def get_history_id(self):
+        with timed("gmail.profile"):
+            profile = await self._get("gmail/v1/users/me/profile")
+        return profile["historyId"]
+
+    async def get_attachment(self, message_id, attachment_id):
+        with timed("gmail.attachment"):
+            att = await self._get(f"{MESSAGES_PATH}/{message_id}/attachments/{attachment_id}")
+        return base64.urlsafe_b64decode(att["data"])
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "max_connections": self._limits.max_connections,
+            "inbox_sync": self.inbox.stats()
+        }
+
+    # -------------------- parsing --------------------
+    async def parse_message(self, msg_data, with_attachments=True):
+        """
+        Parse a message resource into an email, reusing the message cache;
+        attachment downloads run concurrently and extraction runs in an
+        executor
+        """
+        message_id = msg_data["id"]
+        cache = get_message_cache()
+        cached = await asyncio.to_thread(cache.get, message_id)
+
+        if cached is not None:
+            return build_email(
+                message_id, msg_data, cached["headers"], cached["body"],
+                cached["attachments"], cached["attachment_text"]
+            )
+
+        if "payload" not in msg_data:
+            # Cache entry vanished after a minimal fetch; get the full message
+            msg_data = await self.get_message(message_id)
+
+        payload = msg_data.get("payload", {})
+        headers = payload.get("headers", [])
+        body = extract_body(payload)
+
+        attachments = []
+        if with_attachments:
+            parts = list(attachment_parts(payload))
+            blobs = await asyncio.gather(*(
+                self.get_attachment(message_id, part["body"]["attachmentId"])
+                for part in parts
+            ))
+            attachments = [
+                make_attachment(part["filename"], data)
+                for part, data in zip(parts, blobs)
+            ]
+
+        # Readers are CPU bound (and may use the process pool); keep them off the loop
+        attachment_text, attachments, failed = await asyncio.to_thread(
+            summarize_attachments, attachments
+        )
+
+        if with_attachments and not failed:
+            await asyncio.to_thread(
+                cache.put, message_id, headers, body, attachments, attachment_text
+            )
+
+        return build_email(message_id, msg_data, headers, body, attachments, attachment_text)
+
+    async def get_unread_emails(self, max_results=10, level=FETCH_FULL):
+        """
+        Unread emails, newest first, fetched only as deeply as `level` requires
+
+        FETCH_FULL is served from the incrementally synced store; the
+        cheaper levels go straight to Gmail and never touch attachments.
+        """
+        if level not in FETCH_LEVELS:
+            raise ValueError(f"Unknown fetch level: {level}")
+
+        if level == FETCH_FULL:
+            return await self.inbox.unread(max_results)
+
+        message_ids = await self.list_unread_ids(max_results)
+
+        if level == FETCH_IDS:
+            return [{"id": message_id} for message_id in message_ids]
+
+        if level == FETCH_HEADERS:
+            fetched = await self.get_messages(
+                message_ids,
+                format="metadata",
+                metadata_headers=METADATA_HEADERS
+            )
+            return [
+                parse_metadata(fetched[message_id])
+                for message_id in message_ids
+                if message_id in fetched
+            ]
+
+        fetched = await self.get_messages_cached(message_ids)
+
+        # Keep Gmail's ordering (newest first)
+        return list(await asyncio.gather(*(
+            self.parse_message(fetched[message_id], with_attachments=False)
+            for message_id in message_ids
+            if message_id in fetched
+        )))
+
+
+_client = None
+_client_backend = None
+# Replaced clients still closing; held so their tasks aren't collected
+_closing = set()
+
+
+def _close_replaced(client):
+    """
+    Release the connection pool of a client whose backend was replaced
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # No loop running: the pool belongs to a loop that has finished,
+        # whose connections went with it
+        client._http = None
+        return
+
+    task = loop.create_task(client.aclose())
+    _closing.add(task)
+    task.add_done_callback(_closing.discard)
+
+
+def get_async_gmail_client():
+    global _client, _client_backend
+
+    # Created on first use from inside the running event loop, and again
+    # whenever a different mail backend is installed
+    backend = get_mail_backend()
+    if _client is None or _client_backend is not backend:
+        if _client is not None:
+            _close_replaced(_client)
+        _client = AsyncGmailClient(backend.root_url, backend.get_token, backend.transport)
+        _client_backend = backend
+
+    return _client
+
+
+async def get_unread_emails_async(max_results=10, level=FETCH_FULL):
+    return await get_async_gmail_client().get_unread_emails(max_results=max_results, level=level)
@@ -1,49 +1,14 @@
 import os
 import base64
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+import tempfile
 
+from services.metrics import timed
 from ai_logic.readers.attachment_processor import (
     process_all_attachments,
-    create_attachment_summary
+    create_attachment_summary,
+    cleanup_attachments
 )
 
-SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
-TOKEN_FILE = "token.json"
-CREDENTIALS_FILE = "client_secret.json"
-
-
-# ============================ GMAIL SERVICE ============================
-
-def get_gmail_service():
-    creds = None
-
-    # Load existing token
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-
-    # If no valid credentials, force OAuth login
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            if not os.path.exists(CREDENTIALS_FILE):
-                raise RuntimeError("Missing client_secret.json for Gmail OAuth")
-
-            flow = InstalledAppFlow.from_client_secrets_file(
-                CREDENTIALS_FILE,
-                SCOPES
-            )
-            creds = flow.run_local_server(port=0)
-
-        # Save token for future runs
-        with open(TOKEN_FILE, "w") as token:
-            token.write(creds.to_json())
-
-    return build("gmail", "v1", credentials=creds)
-
 
 # ============================ BODY EXTRACTION ============================
 
@@ -79,90 +44,192 @@ def extract_body(payload):
 
 # ============================ ATTACHMENTS ============================
 
-def extract_attachments(payload, service, message_id, attachments_list):
-    parts = payload.get("parts", [])
+# Attachments are handed to the readers straight from memory; only ones
+# above this size are spooled to a uniquely named temp file
+ATTACHMENT_SPOOL_THRESHOLD = int(os.getenv("ATTACHMENT_SPOOL_THRESHOLD", 10 * 1024 * 1024))
 
-    for part in parts:
+
+def attachment_parts(payload):
+    """
+    Yield every MIME part (at any depth) that is a downloadable attachment
+    """
+    for part in payload.get("parts", []):
         if part.get("filename") and part.get("body", {}).get("attachmentId"):
-            att_id = part["body"]["attachmentId"]
+            yield part
+
+        if part.get("parts"):
+            yield from attachment_parts(part)
+
+
+def make_attachment(filename, file_data):
+    attachment = {
+        "filename": filename,
+        "size": len(file_data)
+    }
+
+    if len(file_data) <= ATTACHMENT_SPOOL_THRESHOLD:
+        attachment["data"] = file_data
+    else:
+        suffix = os.path.splitext(filename)[1]
+        fd, file_path = tempfile.mkstemp(prefix="inboxai_", suffix=suffix)
+        with os.fdopen(fd, "wb") as f:
+            f.write(file_data)
+        attachment["path"] = file_path
+
+    return attachment
+
+
+def summarize_attachments(attachments):
+    """
+    Extract text from downloaded attachments and release their bytes/files
+
+    Returns:
+        (attachment_text, metadata list, failed)
+    """
+    attachment_text = ""
+    failed = False
+
+    if attachments:
+        try:
+            processed = process_all_attachments(attachments)
+            attachment_text = create_attachment_summary(processed)
+        except Exception as e:
+            attachment_text = f"[Error processing {len(attachments)} attachment(s)]"
+            failed = True
+        finally:
+            cleanup_attachments(attachments)
+
+    # Keep only metadata; the bytes are not needed once text is extracted
+    metadata = [
+        {"filename": a["filename"], "size": a["size"]}
+        for a in attachments
+    ]
+    return attachment_text, metadata, failed
+
+
+# ============================ BATCH FETCH ============================
+# For the discovery client; the app itself fetches through
+# services.gmail_async, and benchmarks/bench_gmail_fetch compares these
+
+# Gmail accepts up to 100 calls per batch but starts rate limiting well
+# before that, so stay at the documented sweet spot.
+BATCH_SIZE = 50
+
+
+def fetch_messages_batch(service, message_ids, format="full", **params):
+    """
+    Fetch many messages through the Gmail batch endpoint
+
+    Returns:
+        dict of message_id -> message resource. A message that fails
+        inside a batch is retried once on its own and skipped if it
+        still fails, so one bad message never sinks the others.
+    """
+    fetched = {}
+    failed = []
+
+    def on_response(request_id, response, exception):
+        if exception is not None:
+            failed.append(request_id)
+        else:
+            fetched[request_id] = response
+
+    for start in range(0, len(message_ids), BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=on_response)
+
+        for message_id in message_ids[start:start + BATCH_SIZE]:
+            batch.add(
+                service.users().messages().get(
+                    userId="me",
+                    id=message_id,
+                    format=format,
+                    **params
+                ),
+                request_id=message_id
+            )
 
-            att = service.users().messages().attachments().get(
+        with timed("gmail.batch_get"):
+            batch.execute()
+
+    for message_id in failed:
+        try:
+            fetched[message_id] = service.users().messages().get(
                 userId="me",
-                messageId=message_id,
-                id=att_id
+                id=message_id,
+                format=format,
+                **params
             ).execute()
+        except Exception:
+            continue
 
-            file_data = base64.urlsafe_b64decode(att["data"].encode("UTF-8"))
+    return fetched
 
-            os.makedirs("temp_attachments", exist_ok=True)
-            file_path = f"temp_attachments/{part['filename']}"
 
-            with open(file_path, "wb") as f:
-                f.write(file_data)
+def fetch_messages_sequential(service, message_ids, format="full", **params):
+    """
+    Fetch messages one HTTP round trip at a time (pre-batching behaviour)
+    """
+    fetched = {}
 
-            attachments_list.append({
-                "filename": part["filename"],
-                "path": file_path
-            })
+    for message_id in message_ids:
+        try:
+            fetched[message_id] = service.users().messages().get(
+                userId="me",
+                id=message_id,
+                format=format,
+                **params
+            ).execute()
+        except Exception:
+            continue
 
-        if part.get("parts"):
-            extract_attachments(part, service, message_id, attachments_list)
-
-
-# ============================ MAIN FUNCTION ============================
-
-def get_unread_emails(max_results=10):
-    service = get_gmail_service()
-
-    results = service.users().messages().list(
-        userId="me",
-        labelIds=["UNREAD"],
-        maxResults=max_results
-    ).execute()
-
-    messages = results.get("messages", [])
-    emails = []
-
-    for msg in messages:
-        msg_data = service.users().messages().get(
-            userId="me",
-            id=msg["id"],
-            format="full"
-        ).execute()
-
-        payload = msg_data.get("payload", {})
-        headers = payload.get("headers", [])
-
-        sender = next(
-            (h["value"] for h in headers if h["name"].lower() == "from"),
-            "Unknown"
-        )
-
-        subject = next(
-            (h["value"] for h in headers if h["name"].lower() == "subject"),
-            "No Subject"
-        )
-
-        body = extract_body(payload)
-
-        attachments = []
-        extract_attachments(payload, service, msg["id"], attachments)
-
-        attachment_text = ""
-        if attachments:
-            try:
-                processed = process_all_attachments(attachments)
-                attachment_text = create_attachment_summary(processed)
-            except Exception as e:
-                attachment_text = f"[Error processing {len(attachments)} attachment(s)]"
-
-        emails.append({
-            "id": msg["id"],
-            "from": sender,
-            "subject": subject,
-            "body": body,
-            "attachments": attachments,
-            "attachment_text": attachment_text
-        })
-
-    return emails
+    return fetched
+
+
+# ============================ MESSAGE PARSING ============================
+
+def get_header(headers, name, default=""):
+    return next(
+        (h["value"] for h in headers if h["name"].lower() == name),
+        default
+    )
+
+
+def build_email(message_id, msg_data, headers, body, attachments, attachment_text):
+    return {
+        "id": message_id,
+        "from": get_header(headers, "from", "Unknown"),
+        "subject": get_header(headers, "subject", "No Subject"),
+        # Same keys as parse_metadata, so a FULL snapshot can serve a headers view
+        "date": get_header(headers, "date"),
+        "body": body,
+        "attachments": attachments,
+        "attachment_text": attachment_text,
+        # Cheap signals for local categorization
+        "labels": msg_data.get("labelIds", []),
+        "list_unsubscribe": bool(get_header(headers, "list-unsubscribe")),
+        "precedence": get_header(headers, "precedence").lower()
+    }
+
+
+# ============================ FETCH LEVELS ============================
+
+# Cheapest first; callers should ask for the least they need
+FETCH_IDS = "ids"          # messages.list only
+FETCH_HEADERS = "headers"  # + format=metadata for a handful of headers
+FETCH_BODY = "body"        # + decoded body, attachments skipped
+FETCH_FULL = "full"        # + attachments downloaded and extracted
+
+FETCH_LEVELS = (FETCH_IDS, FETCH_HEADERS, FETCH_BODY, FETCH_FULL)
+
+METADATA_HEADERS = ["From", "Subject", "Date"]
+
+
+def parse_metadata(msg_data):
+    headers = msg_data.get("payload", {}).get("headers", [])
+
+    return {
+        "id": msg_data["id"],
+        "from": get_header(headers, "from", "Unknown"),
+        "subject": get_header(headers, "subject", "No Subject"),
+        "date": get_header(headers, "date")
+    }
@@ -0,0 +1,129 @@
+import os
+import threading
+from datetime import datetime, timedelta
+
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+
+SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
+TOKEN_FILE = "token.json"
+CREDENTIALS_FILE = "client_secret.json"
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+
+# Refresh this long before Google's expiry so no request races the deadline
+REFRESH_MARGIN = timedelta(minutes=5)
+
+
+# ============================ CREDENTIAL SOURCES ============================
+
+def load_token_file_credentials():
+    """
+    Load credentials from token.json, running the local OAuth flow if needed
+    """
+    creds = None
+
+    if os.path.exists(TOKEN_FILE):
+        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+
+    if creds and creds.refresh_token:
+        return creds
+
+    if creds and creds.valid:
+        return creds
+
+    if not os.path.exists(CREDENTIALS_FILE):
+        raise RuntimeError("Missing client_secret.json for Gmail OAuth")
+
+    flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
+    creds = flow.run_local_server(port=0)
+    save_token_file(creds)
+    return creds
+
+
+def load_env_credentials():
+    """
+    Build credentials from GMAIL_REFRESH_TOKEN / GOOGLE_CLIENT_ID / GOOGLE_CLIENT_SECRET
+    """
+    return Credentials(
+        token=None,
+        refresh_token=os.getenv("GMAIL_REFRESH_TOKEN"),
+        token_uri=TOKEN_URI,
+        client_id=os.getenv("GOOGLE_CLIENT_ID"),
+        client_secret=os.getenv("GOOGLE_CLIENT_SECRET"),
+        scopes=SCOPES,
+    )
+
+
+def save_token_file(creds):
+    with open(TOKEN_FILE, "w") as token:
+        token.write(creds.to_json())
+
+
+# ============================ SERVICE MANAGER ============================
+
+class GmailServiceManager:
+    """
+    Process-wide owner of the Gmail credentials.
+
+    Credentials are loaded once and refreshed under a lock shortly before
+    they expire; the async Gmail client asks for a bearer token through
+    services.backends on every request.
+    """
+
+    def __init__(self, load_credentials, persist_credentials=None):
+        self._load_credentials = load_credentials
+        self._persist_credentials = persist_credentials
+        self._creds = None
+        self._lock = threading.Lock()
+
+    # -------------------- credentials --------------------
+    def _needs_refresh(self, creds):
+        if not creds.token:
+            return True
+        if creds.expiry is None:
+            return False
+        # google-auth keeps expiry as a naive UTC datetime
+        return creds.expiry - datetime.utcnow() <= REFRESH_MARGIN
+
+    def get_credentials(self):
+        with self._lock:
+            if self._creds is None:
+                self._creds = self._load_credentials()
+
+            if self._needs_refresh(self._creds):
+                if not self._creds.refresh_token:
+                    raise RuntimeError("Gmail credentials expired and cannot be refreshed")
+                self._creds.refresh(Request())
+                if self._persist_credentials:
+                    self._persist_credentials(self._creds)
+
+            return self._creds
+
+    def reset(self):
+        """
+        Drop cached credentials (e.g. after the token is revoked)
+        """
+        with self._lock:
+            self._creds = None
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_service_manager():
+    global _manager
+
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                if os.getenv("GMAIL_REFRESH_TOKEN"):
+                    _manager = GmailServiceManager(load_env_credentials)
+                else:
+                    _manager = GmailServiceManager(
+                        load_token_file_credentials,
+                        persist_credentials=save_token_file
+                    )
+
+    return _manager
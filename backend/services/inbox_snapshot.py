@@ -0,0 +1,160 @@
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import Future
+
+from services.gmail_client import FETCH_LEVELS, FETCH_IDS, FETCH_FULL
+from services.gmail_async import get_unread_emails_async, get_async_gmail_client
+
+INBOX_SNAPSHOT_TTL = float(os.getenv("INBOX_SNAPSHOT_TTL", 30))
+
+
+class InboxSnapshots:
+    """
+    Short-lived, shared views of the unread inbox.
+
+    Concurrent callers asking for the same (level, max_results) view wait
+    on one in-flight fetch instead of each hitting Gmail, and the result
+    is reused for `ttl` seconds. A fresh snapshot that is at least as deep
+    and at least as long also answers narrower requests, so "summarize
+    them" right after "show categories" costs nothing.
+    """
+
+    def __init__(self, ttl=INBOX_SNAPSHOT_TTL, loader=get_unread_emails_async):
+        self.ttl = ttl
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._snapshots = {}  # (level, max_results) -> (taken_at, emails)
+        self._in_flight = {}  # (level, max_results) -> Future
+        self._generation = 0
+        # Mailbox historyId seen by the last inbox_version() call
+        self.history_id = None
+        # Wall-clock time of the newest fetch, reported as response freshness
+        self.fetched_at = None
+        self.hits = 0
+        self.shared = 0
+        self.fetches = 0
+
+    def _fresh_covering(self, level, max_results, now):
+        depth = FETCH_LEVELS.index(level)
+
+        for key, (taken_at, _) in list(self._snapshots.items()):
+            if now - taken_at >= self.ttl:
+                del self._snapshots[key]
+
+        for (snap_level, snap_max), (taken_at, emails) in self._snapshots.items():
+            if FETCH_LEVELS.index(snap_level) >= depth and snap_max >= max_results:
+                return emails[:max_results]
+
+        return None
+
+    def _claim(self, key):
+        """
+        Returns:
+            (cached emails or None, in-flight Future, leader, generation)
+        """
+        level, max_results = key
+
+        with self._lock:
+            emails = self._fresh_covering(level, max_results, time.monotonic())
+            if emails is not None:
+                self.hits += 1
+                return list(emails), None, False, None
+
+            future = self._in_flight.get(key)
+            leader = future is None
+            generation = None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                generation = self._generation
+                self.fetches += 1
+            else:
+                self.shared += 1
+
+        return None, future, leader, generation
+
+    def _settle(self, key, future, generation, emails=None, error=None):
+        with self._lock:
+            self._in_flight.pop(key, None)
+            # Don't resurrect a view that was invalidated mid-fetch
+            if error is None and generation == self._generation:
+                self._snapshots[key] = (time.monotonic(), emails)
+                self.fetched_at = time.time()
+
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(emails)
+
+    async def aget(self, max_results=10, level=FETCH_FULL):
+        key = (level, max_results)
+        emails, future, leader, generation = self._claim(key)
+
+        if emails is not None:
+            return emails
+
+        if not leader:
+            return list(await asyncio.wrap_future(future))
+
+        try:
+            emails = await self._loader(max_results=max_results, level=level) or []
+        except BaseException as e:
+            # Cancellation included, or followers would wait forever
+            self._settle(key, future, generation, error=e)
+            raise
+
+        self._settle(key, future, generation, emails)
+        return list(emails)
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshots.clear()
+            self._generation += 1
+
+    def stats(self):
+        return {
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "shared_in_flight": self.shared,
+            "fetches": self.fetches,
+            "fetched_at": self.fetched_at,
+            "snapshots": len(self._snapshots)
+        }
+
+
+_snapshots = InboxSnapshots()
+
+
+async def inbox_version(max_results=10):
+    """
+    What the unread view currently depends on: the mailbox historyId and
+    the unread IDs
+
+    A changed historyId means the mailbox moved since the snapshots were
+    taken, so they are dropped before the IDs are read; an unchanged one
+    lets a fresh snapshot answer without another messages.list.
+
+    Returns:
+        (history_id, [message_id, ...])
+    """
+    history_id = await get_async_gmail_client().get_history_id()
+    if history_id != _snapshots.history_id:
+        _snapshots.invalidate()
+        _snapshots.history_id = history_id
+
+    emails = await _snapshots.aget(max_results=max_results, level=FETCH_IDS)
+    return history_id, [email["id"] for email in emails]
+
+
+async def get_inbox_snapshot_async(max_results=10, level=FETCH_FULL):
+    return await _snapshots.aget(max_results=max_results, level=level)
+
+
+def invalidate_inbox_snapshots():
+    _snapshots.invalidate()
+
+
+def get_inbox_snapshots():
+    return _snapshots
@@ -0,0 +1,181 @@
+import asyncio
+
+import httpx
+
+UNREAD_LABEL = "UNREAD"
+
+HISTORY_TYPES = ["messageAdded", "messageDeleted", "labelAdded", "labelRemoved"]
+
+
+class InboxSync:
+    """
+    Local mirror of the unread inbox kept current through Gmail's history API.
+
+    The first sync (or one after the stored historyId expires) lists and
+    downloads the unread window in full. Every later sync costs one
+    users.history.list call plus concurrent fetches of just the messages
+    that became unread since the last historyId.
+
+    The store mirrors as many messages as the largest request so far
+    asked for, so the first (full) sync downloads and extracts no more
+    than the caller needs.
+
+    Each AsyncGmailClient owns one, so installing another mail backend
+    starts from an empty store.
+    """
+
+    def __init__(self, client, window=None):
+        self.client = client
+        self.window = window
+        self.history_id = None
+        self._messages = {}       # message_id -> parsed email
+        self._internal_dates = {}  # message_id -> internalDate (ms)
+        self._complete = False     # True when the store holds every unread message
+        self._lock = asyncio.Lock()
+        self.full_syncs = 0
+        self.history_syncs = 0
+
+    # -------------------- public --------------------
+    async def sync(self):
+        async with self._lock:
+            if self.history_id is None:
+                await self._full_resync()
+                return
+
+            try:
+                await self._apply_history()
+            except httpx.HTTPStatusError as e:
+                # 404 means startHistoryId is too old for Gmail to replay
+                if e.response.status_code != 404:
+                    raise
+                await self._full_resync()
+
+    async def unread(self, max_results=10):
+        if self.window is None or max_results > self.window:
+            self.window = max_results
+            self.history_id = None
+
+        await self.sync()
+
+        # Reads can shrink the store below what the caller wants while
+        # older unread mail still exists outside the window
+        if len(self._messages) < max_results and not self._complete:
+            self.history_id = None
+            await self.sync()
+
+        newest_first = sorted(
+            self._messages,
+            key=lambda message_id: self._internal_dates.get(message_id, 0),
+            reverse=True
+        )
+        return [self._messages[message_id] for message_id in newest_first[:max_results]]
+
+    def reset(self):
+        self.history_id = None
+        self._messages.clear()
+        self._internal_dates.clear()
+        self._complete = False
+
+    def stats(self):
+        return {
+            "history_id": self.history_id,
+            "messages": len(self._messages),
+            "window": self.window,
+            "full_syncs": self.full_syncs,
+            "history_syncs": self.history_syncs
+        }
+
+    # -------------------- internals --------------------
+    async def _store(self, message_ids):
+        fetched = await self.client.get_messages_cached(message_ids)
+        unread = [
+            msg_data for msg_data in fetched.values()
+            if UNREAD_LABEL in msg_data.get("labelIds", [])
+        ]
+        parsed = await asyncio.gather(*(self.client.parse_message(msg_data) for msg_data in unread))
+
+        for msg_data, email in zip(unread, parsed):
+            self._messages[msg_data["id"]] = email
+            self._internal_dates[msg_data["id"]] = int(msg_data.get("internalDate", 0))
+
+    def _forget(self, message_id):
+        self._messages.pop(message_id, None)
+        self._internal_dates.pop(message_id, None)
+
+    async def _full_resync(self):
+        self.full_syncs += 1
+        # Take the historyId first so changes made during the listing are
+        # replayed on the next sync instead of being lost
+        history_id = await self.client.get_history_id()
+        message_ids, complete = await self.client.list_unread(self.window)
+
+        known = {
+            message_id: self._messages[message_id]
+            for message_id in message_ids
+            if message_id in self._messages
+        }
+        dates = {
+            message_id: self._internal_dates[message_id]
+            for message_id in known
+        }
+
+        self._messages = known
+        self._internal_dates = dates
+
+        await self._store([message_id for message_id in message_ids if message_id not in known])
+
+        self._complete = complete
+        self.history_id = history_id
+
+    async def _apply_history(self):
+        self.history_syncs += 1
+        to_fetch = set()
+        page_token = None
+        latest_history_id = self.history_id
+
+        while True:
+            response = await self.client.list_history(self.history_id, HISTORY_TYPES, page_token)
+
+            for record in response.get("history", []):
+                for item in record.get("messagesAdded", []):
+                    message = item["message"]
+                    if UNREAD_LABEL in message.get("labelIds", []):
+                        to_fetch.add(message["id"])
+
+                for item in record.get("messagesDeleted", []):
+                    to_fetch.discard(item["message"]["id"])
+                    self._forget(item["message"]["id"])
+
+                for item in record.get("labelsAdded", []):
+                    if UNREAD_LABEL in item.get("labelIds", []):
+                        to_fetch.add(item["message"]["id"])
+
+                for item in record.get("labelsRemoved", []):
+                    if UNREAD_LABEL in item.get("labelIds", []):
+                        to_fetch.discard(item["message"]["id"])
+                        self._forget(item["message"]["id"])
+
+            latest_history_id = response.get("historyId", latest_history_id)
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+
+        to_fetch -= set(self._messages)
+        if to_fetch:
+            await self._store(sorted(to_fetch))
+
+        self._trim()
+        self.history_id = latest_history_id
+
+    def _trim(self):
+        if len(self._messages) <= self.window:
+            return
+
+        newest_first = sorted(
+            self._messages,
+            key=lambda message_id: self._internal_dates.get(message_id, 0),
+            reverse=True
+        )
+        for message_id in newest_first[self.window:]:
+            self._forget(message_id)
+        self._complete = False
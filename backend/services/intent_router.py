@@ -0,0 +1,293 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from difflib import get_close_matches
+from functools import lru_cache
+
+from services.command_parser import normalize_command, parse_command
+from services.local_classifier import HashedNaiveBayes
+
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", "cache/intent_model.json")
+INTENT_CACHE_ENTRIES = int(os.getenv("INTENT_CACHE_ENTRIES", 1000))
+
+# Longer commands tend to carry constraints the rules can't see
+MAX_ROUTED_WORDS = 12
+
+EMAIL_WORDS = {"email", "emails", "mail", "mails", "message", "messages", "inbox", "unread"}
+
+# Each rule fires only when every keyword group is present
+INTENT_RULES = [
+    # Singular only: "the latest emails" asks for several
+    ("get_last_email_summary", [
+        {"last", "latest", "recent", "newest"},
+        {"email", "mail", "message", "one"},
+    ]),
+    ("get_unread_email_categories", [
+        {"category", "categories", "categorize", "categorise", "label", "labels",
+         "type", "types", "classify", "classification", "sort"},
+    ]),
+    ("get_unread_emails_summary", [
+        {"summarize", "summarise", "summary", "summaries", "read", "check", "show",
+         "tell", "what", "whats", "any", "list", "go", "through"},
+        EMAIL_WORDS,
+    ]),
+]
+
+# Words that change what a command means; leave those to the LLM.
+# "most" ranks ("most important", "who emailed me most") unless it is
+# part of "most recent", which MOST_RECENT_RE folds away first
+HEDGE_WORDS = {"not", "dont", "don", "never", "except", "without", "but", "instead",
+               "reply", "send", "delete", "archive", "forward", "write", "draft", "most"}
+
+MOST_RECENT_RE = re.compile(r"\bmost (?=recent|latest|newest)")
+
+# Conjunctions that can join requests for different tools
+CONJUNCTION_RE = re.compile(r"\b(?:and|also|plus|then|as well as)\b")
+
+# Politeness and request phrasing stripped before checking how a command opens
+LEAD_IN_RE = re.compile(
+    r"^(?:(?:please|pls|hey|hi|ok|okay|so|now|just|quickly|can|could|would|will|you"
+    r"|(?:i d like|i would like|i want|i need)(?: to)?(?: a| an| the| my)?"
+    r"|let me|lets|let s)\s+)+"
+)
+
+# A command opening with one of these is an instruction
+COMMAND_VERBS = {"summarize", "summarise", "read", "check", "show", "tell", "list", "go",
+                 "give", "get", "fetch", "find", "open", "sort", "categorize", "categorise",
+                 "classify", "label"}
+
+# A question opening with one of these is only a request when it is about
+# the user's own mail ("any new emails?", not "what is spam email?")
+QUESTION_WORDS = {"what", "whats", "which", "any", "anything", "do", "did", "have", "has",
+                  "is", "are", "how"}
+OWN_MAIL_WORDS = {"my", "me", "i", "new", "unread", "inbox", "recent", "latest", "last", "newest"}
+
+SENDER_RE = re.compile(
+    r"\b(?:mail|mails|email|emails|message|messages|anything|something)\s+from\s+(?P<sender>[\w@. ]+)$"
+)
+
+# Model label for commands the LLM answered without a tool (greetings,
+# chit-chat); predicting it sends the command to the LLM
+CHAT_LABEL = "__chat__"
+
+# _match_rules verdict for commands that must go to the LLM, not the model
+ASK_LLM = "ask_llm"
+
+RULE_WORDS = set().union(*(group for _, groups in INTENT_RULES for group in groups))
+
+VOCABULARY = sorted(RULE_WORDS | EMAIL_WORDS | COMMAND_VERBS | HEDGE_WORDS | {"from"})
+
+# Short words sit too close to unrelated ones ("short" -> "sort",
+# "sender" -> "send"), so only long words are snapped, onto long words
+FUZZY_MIN_LENGTH = 6
+FUZZY_VOCABULARY = [word for word in VOCABULARY if len(word) >= FUZZY_MIN_LENGTH]
+
+
+@lru_cache(maxsize=4096)
+def _correct(word):
+    """
+    Snap a misspelled word onto the rule vocabulary ("sumarize", "emials")
+    """
+    if len(word) < FUZZY_MIN_LENGTH - 1 or word in VOCABULARY:
+        return word
+    match = get_close_matches(word, FUZZY_VOCABULARY, n=1, cutoff=0.8)
+    return match[0] if match else word
+
+
+def _is_request(words):
+    """
+    True when the command asks for something: it opens with a command
+    verb or a rule keyword ("summarize ...", "latest email"), or is a
+    question about the user's own mail. Statements ("I already read my
+    emails") and general questions ("what is spam email") are not.
+    """
+    if not words:
+        return False
+
+    if words[0] in COMMAND_VERBS or words[0] in RULE_WORDS - QUESTION_WORDS:
+        return True
+
+    return words[0] in QUESTION_WORDS and bool(set(words) & OWN_MAIL_WORDS)
+
+
+def _intents(words, groups_checked=None):
+    """
+    Tools whose keyword groups all match; with groups_checked=1 only the
+    action group has to
+    """
+    matched = [
+        name for name, groups in INTENT_RULES
+        if all(words & group for group in groups[:groups_checked])
+    ]
+
+    # The inbox summary is the catch-all; a narrower match wins over it
+    if len(matched) > 1 and "get_unread_emails_summary" in matched:
+        matched.remove("get_unread_emails_summary")
+
+    return matched
+
+
+def _is_compound(text):
+    """
+    True when conjoined clauses ask for different tools ("summarize my
+    inbox and tell me the categories"); the LLM can call several
+    """
+    clauses = CONJUNCTION_RE.split(text)
+    if len(clauses) < 2:
+        return False
+
+    asked = set()
+    for clause in clauses:
+        asked.update(_intents({_correct(word) for word in clause.split()}, groups_checked=1))
+    return len(asked) > 1
+
+
+class IntentRouter:
+    """
+    Resolves common /command phrasings to a tool call without the LLM.
+
+    Lookup order: an LRU of normalized commands already resolved (by the
+    rules or by the LLM), keyword rules over typo-corrected words, then a
+    small naive Bayes trained on the LLM's past decisions. Only requests
+    are routed locally; statements, general questions and commands that
+    join requests for different tools go to the LLM, as does anything
+    ambiguous. learn() feeds the LLM's choice back into the cache and
+    the model.
+    """
+
+    def __init__(self, cache_entries=INTENT_CACHE_ENTRIES, model_path=INTENT_MODEL_PATH):
+        self.cache_entries = cache_entries
+        self.model = HashedNaiveBayes(path=model_path)
+        self._cache = OrderedDict()  # normalized command -> (name, args, learned)
+        self._lock = threading.Lock()
+        self.counts = {"cache": 0, "rule": 0, "model": 0, "llm": 0}
+
+    def _remember(self, normalized, name, args, learned=False):
+        # Caller holds _lock
+        self._cache[normalized] = (name, args, learned)
+        self._cache.move_to_end(normalized)
+        while len(self._cache) > self.cache_entries:
+            self._cache.popitem(last=False)
+
+    def _match_rules(self, normalized):
+        """
+        Returns:
+            (function_name, args), None when the rules can't tell, or
+            ASK_LLM when only the LLM should resolve the command
+        """
+        sender = SENDER_RE.search(normalized)
+        if sender:
+            return "check_emails_from_sender", {"sender_query": sender.group("sender").strip()}
+
+        text = LEAD_IN_RE.sub("", MOST_RECENT_RE.sub("", normalized))
+        words = [_correct(word) for word in text.split()]
+        if not _is_request(words) or _is_compound(text):
+            return ASK_LLM
+
+        words = set(words)
+        if words & HEDGE_WORDS:
+            return None
+
+        matched = _intents(words)
+        if len(matched) == 1:
+            return matched[0], {}
+
+        if not matched and parse_command(normalized)["intent"] == "SUMMARIZE_EMAILS":
+            return "get_unread_emails_summary", {}
+
+        return None
+
+    def route(self, command, history=None):
+        """
+        Returns:
+            (function_name, args, source) or None when the LLM should decide
+        """
+        normalized = normalize_command(command)
+        if not normalized or len(normalized.split()) > MAX_ROUTED_WORDS:
+            return self._miss()
+
+        with self._lock:
+            cached = self._cache.get(normalized)
+            # Follow-ups ("and the one before?") depend on the conversation,
+            # so the LLM's context-free answers are not reused mid-thread
+            if cached is not None and not (cached[2] and history):
+                self._cache.move_to_end(normalized)
+                self.counts["cache"] += 1
+                return cached[0], dict(cached[1]), "cache"
+
+        matched = self._match_rules(normalized)
+        source = "rule"
+
+        if matched is ASK_LLM:
+            return self._miss()
+
+        if matched is None and not history:
+            name = self.model.classify({"subject": normalized})
+            if name and name != CHAT_LABEL:
+                matched, source = (name, {}), "model"
+
+        if matched is None:
+            return self._miss()
+
+        with self._lock:
+            self._remember(normalized, *matched)
+            self.counts[source] += 1
+
+        return matched[0], dict(matched[1]), source
+
+    def _miss(self):
+        with self._lock:
+            self.counts["llm"] += 1
+        return None
+
+    def learn(self, command, name, args, history=None):
+        """
+        Remember the LLM's tool choice for a command it had to resolve
+        (name None when it replied without calling a tool)
+        """
+        if history:
+            return
+
+        normalized = normalize_command(command)
+        if not normalized:
+            return
+
+        if name is None:
+            self.model.learn({"subject": normalized}, CHAT_LABEL)
+            return
+
+        with self._lock:
+            self._remember(normalized, name, args, learned=True)
+
+        # Argument-free tools only; the model can't fill in a sender
+        if not args:
+            self.model.learn({"subject": normalized}, name)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+            entries = len(self._cache)
+
+        total = sum(counts.values())
+        return {
+            **counts,
+            "hit_rate": (total - counts["llm"]) / total if total else 0.0,
+            "cache_entries": entries,
+            "model_examples": self.model.examples
+        }
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_intent_router():
+    global _router
+
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = IntentRouter()
+
+    return _router
@@ -1,8 +1,441 @@
 import os
 import json
-from groq import Groq
+import time
+import random
+import asyncio
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from groq import RateLimitError, APITimeoutError, APIConnectionError, APIStatusError
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+from services.backends import get_llm_backend
+from services.metrics import timed
+
+MODEL = "llama-3.1-8b-instant"
+
+SUMMARIZER_SYSTEM_PROMPT = "You are an expert email summarizer. Summarize emails concisely in 2-3 sentences, mentioning key points from both the email body and any attachments."
+
+# ===================== RATE LIMITING =====================
+# Defaults match Groq's free tier for llama-3.1-8b-instant
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", 30))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", 6000))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 5))
+
+# Completion tokens reserved up front; corrected from response.usage afterwards
+EXPECTED_COMPLETION_TOKENS = 150
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text
+    return len(text or "") // 4 + 1
+
+
+class RateLimiter:
+    """
+    Sliding one-minute window over both request count and token spend.
+
+    acquire_async() waits, without holding the event loop, until the call
+    fits in both budgets and returns a reservation, or None once
+    `deadline_at` (time.monotonic()) passes first. settle() replaces the
+    estimate with the real usage.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute, window=60.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.window = window
+        self._events = []  # [timestamp, tokens]
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+
+    def _try_reserve(self, tokens):
+        """
+        Returns:
+            (reservation, 0) or (None, seconds to wait before trying again)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._events = [e for e in self._events if now - e[0] < self.window]
+            used = sum(e[1] for e in self._events)
+
+            # An oversized call is let through on an idle window rather than blocking forever
+            fits_tokens = used + tokens <= self.tokens_per_minute or not self._events
+            if len(self._events) < self.requests_per_minute and fits_tokens:
+                event = [now, tokens]
+                self._events.append(event)
+                return event, 0
+
+            wait = min(max(self._events[0][0] + self.window - now, 0.05), 1.0)
+            self.waited_seconds += wait
+            return None, wait
+
+    async def acquire_async(self, tokens, deadline_at=None):
+        while True:
+            event, wait = self._try_reserve(tokens)
+            if event is not None:
+                return event
+            if deadline_at is not None:
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    return None
+                wait = min(wait, remaining)
+            await asyncio.sleep(wait)
+
+    def settle(self, event, tokens):
+        with self._lock:
+            event[1] = tokens
+
+    def headroom(self):
+        """
+        Fraction of the tighter of the two budgets still free in the window
+        """
+        with self._lock:
+            now = time.monotonic()
+            events = [e for e in self._events if now - e[0] < self.window]
+            used_tokens = sum(e[1] for e in events)
+
+        requests_free = 1 - len(events) / self.requests_per_minute
+        tokens_free = 1 - used_tokens / self.tokens_per_minute
+        return max(min(requests_free, tokens_free), 0.0)
+
+
+rate_limiter = RateLimiter(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE)
+
+
+# ===================== RESILIENCE =====================
+# Per attempt, and for the whole call including retries and backoff
+LLM_ATTEMPT_TIMEOUT = float(os.getenv("LLM_ATTEMPT_TIMEOUT", 10))
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", 25))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+LLM_BACKOFF_BASE = 0.5
+LLM_BACKOFF_CAP = 8.0
+
+# Send a duplicate request when the first has not answered after this
+# many seconds (0 disables hedging; it costs rate-limit budget)
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", 0))
+
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 5))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", 30))
+
+
+class LLMUnavailable(Exception):
+    """
+    The provider is failing or the circuit is open; callers should use
+    their local fallback
+    """
+
+
+def _is_retryable(error):
+    if isinstance(error, (RateLimitError, APITimeoutError, APIConnectionError)):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+
+def _is_auth_error(error):
+    return isinstance(error, APIStatusError) and error.status_code in (401, 403)
+
+
+def _retry_after(error):
+    """
+    Seconds the provider asked us to wait, if it said so
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, error=None):
+    """
+    Full-jitter exponential backoff, never shorter than Retry-After
+    """
+    delay = random.uniform(0, min(LLM_BACKOFF_CAP, LLM_BACKOFF_BASE * 2 ** attempt))
+    retry_after = _retry_after(error) if error is not None else None
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failures` consecutive failed calls; while open,
+    calls fail immediately. After `reset_timeout` one probe call is let
+    through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failures=LLM_BREAKER_FAILURES, reset_timeout=LLM_BREAKER_RESET):
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._probing = False
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "closed":
+                return
+
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probing = False
+
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return
+
+            self.rejected += 1
+            raise LLMUnavailable("LLM circuit breaker is open")
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self._probing = False
+
+    def record_abandoned(self):
+        """
+        The call gave up before reaching the provider; says nothing about
+        its health, but a half-open probe slot has to be freed
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probing = False
+            if self.state == "half_open" or self.consecutive_failures >= self.failures:
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected
+        }
+
+
+breaker = CircuitBreaker()
+
+_metrics = {
+    "calls": 0,
+    "attempts": 0,
+    "retries": 0,
+    "hedges": 0,
+    "hedge_wins": 0,
+    "failures": 0,
+    "deadline_exceeded": 0
+}
+_metrics_lock = threading.Lock()
+
+
+def _count(metric):
+    with _metrics_lock:
+        _metrics[metric] += 1
+
+
+def _reserved_tokens(kwargs):
+    prompt_tokens = sum(
+        estimate_tokens(m.get("content") if isinstance(m, dict) else getattr(m, "content", ""))
+        for m in kwargs.get("messages", [])
+    )
+    return prompt_tokens + EXPECTED_COMPLETION_TOKENS
+
+
+def _settle_usage(reservation, response):
+    usage = getattr(response, "usage", None)
+    if usage is not None and getattr(usage, "total_tokens", None):
+        rate_limiter.settle(reservation, usage.total_tokens)
+
+
+def _attempt_timeout(deadline_at, attempt_timeout):
+    """
+    Taken once the rate limiter let the call through, so time spent
+    waiting for budget comes out of the deadline, not on top of it
+    """
+    if deadline_at is None:
+        return attempt_timeout
+    return max(min(attempt_timeout, deadline_at - time.monotonic()), 0.1)
+
+
+def _rate_limit_deadline():
+    _count("deadline_exceeded")
+    return LLMUnavailable("LLM deadline passed while waiting for rate limit budget")
+
+
+async def _asend(kwargs, deadline_at=None, attempt_timeout=LLM_ATTEMPT_TIMEOUT):
+    """
+    One request behind the shared rate limiter
+    """
+    _count("attempts")
+    reservation = await rate_limiter.acquire_async(_reserved_tokens(kwargs), deadline_at)
+    if reservation is None:
+        raise _rate_limit_deadline()
+
+    timeout = _attempt_timeout(deadline_at, attempt_timeout)
+    response = await get_llm_backend().async_client.chat.completions.create(timeout=timeout, **kwargs)
+
+    _settle_usage(reservation, response)
+    return response
+
+
+# The duplicate gives up when the original attempt would have
+HEDGE_ATTEMPT_TIMEOUT = max(LLM_ATTEMPT_TIMEOUT - LLM_HEDGE_AFTER, 0.1)
+
+
+async def _asend_hedged(kwargs, deadline_at):
+    first = asyncio.ensure_future(_asend(kwargs, deadline_at))
+    pending = {first}
+
+    # The losing request is cancelled, and both are when the caller itself
+    # is cancelled while waiting on them
+    try:
+        done, _ = await asyncio.wait(pending, timeout=LLM_HEDGE_AFTER)
+        if done:
+            return first.result()
+
+        _count("hedges")
+        second = asyncio.ensure_future(_asend(kwargs, deadline_at, HEDGE_ATTEMPT_TIMEOUT))
+        pending = {first, second}
+        error = None
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is second:
+                        _count("hedge_wins")
+                    return task.result()
+                error = task.exception()
+
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _retry_delay(error, attempt, deadline_at):
+    """
+    Decide what a failed attempt means for the call
+
+    Returns:
+        seconds to back off before the next attempt; raises when the
+        call should give up
+    """
+    if not _is_retryable(error):
+        if _is_auth_error(error):
+            # Every call fails the same way until the key is fixed
+            _count("failures")
+            breaker.record_failure()
+        else:
+            # A rejected request says nothing about the provider's health
+            breaker.record_abandoned()
+        raise error
+
+    delay = backoff_delay(attempt, error)
+    out_of_time = time.monotonic() + delay >= deadline_at
+
+    if attempt + 1 > LLM_MAX_RETRIES or out_of_time:
+        _count("deadline_exceeded" if out_of_time else "failures")
+        breaker.record_failure()
+        raise LLMUnavailable(f"LLM call failed after {attempt + 1} attempt(s): {error}") from error
+
+    _count("retries")
+    return delay
+
+
+async def acreate_completion(deadline=None, stage="llm", **kwargs):
+    """
+    chat.completions.create on the async client behind the shared rate
+    limiter, with per-attempt timeouts, jittered retries inside an
+    overall deadline, optional hedging and a circuit breaker. Waits (rate
+    limit, backoff, hedging) suspend the handler instead of blocking a
+    thread.
+
+    The whole call (waits and retries included) is timed as `stage`.
+    Raises LLMUnavailable when the circuit is open or retries run out;
+    other API errors (bad request, auth) are raised as-is.
+    """
+    with timed(stage):
+        return await _acreate_completion(deadline, kwargs)
+
+
+async def _acreate_completion(deadline, kwargs):
+    breaker.before_call()
+    _count("calls")
+
+    deadline_at = time.monotonic() + (deadline or LLM_DEADLINE)
+    # Streams are not hedged: the first chunk arrives long before completion
+    send = _asend_hedged if LLM_HEDGE_AFTER > 0 and not kwargs.get("stream") else _asend
+    attempt = 0
+
+    while True:
+        try:
+            response = await send(kwargs, deadline_at)
+        except LLMUnavailable:
+            breaker.record_abandoned()
+            raise
+        except Exception as e:
+            await asyncio.sleep(_retry_delay(e, attempt, deadline_at))
+            attempt += 1
+            continue
+
+        breaker.record_success()
+        return response
+
+
+def llm_stats():
+    with _metrics_lock:
+        metrics = dict(_metrics)
+
+    return {
+        **metrics,
+        "backend": get_llm_backend().name,
+        "breaker": breaker.stats(),
+        "rate_limit_waited_seconds": round(rate_limiter.waited_seconds, 3)
+    }
+
+
+async def amap_concurrent(fn, items, max_concurrency=LLM_MAX_CONCURRENCY):
+    """
+    Await fn for every item, at most max_concurrency at once
+
+    Results come back in input order. Throughput is capped by the shared
+    rate limiter, so wall-clock time approaches the slowest single call
+    while staying inside the provider's RPM/TPM budget.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(item):
+        async with semaphore:
+            return await fn(item)
+
+    return list(await asyncio.gather(*(run(item) for item in items)))
 
 # ===================== TOOLS =====================
 tools = [
@@ -62,34 +495,59 @@ tools = [
 ]
 
 # ===================== BASIC LLM =====================
-def call_llm(prompt: str) -> str:
-    response = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
+def _prompt_request(prompt, system_prompt, max_tokens, json_mode=False, stream=False):
+    extra = {"response_format": {"type": "json_object"}} if json_mode else {}
+    if stream:
+        extra["stream"] = True
+
+    return dict(
+        model=MODEL,
         messages=[
             {
                 "role": "system",
-                "content": "You are an expert email summarizer. Summarize emails concisely in 2-3 sentences, mentioning key points from both the email body and any attachments."
+                "content": system_prompt
             },
             {"role": "user", "content": prompt}
         ],
         temperature=0.3,
-        max_tokens=500
+        max_tokens=max_tokens,
+        **extra
+    )
+
+
+async def acall_llm(prompt: str, system_prompt: str = SUMMARIZER_SYSTEM_PROMPT,
+                    max_tokens: int = 500, json_mode: bool = False, stage: str = "llm.completion") -> str:
+    response = await acreate_completion(
+        stage=stage,
+        **_prompt_request(prompt, system_prompt, max_tokens, json_mode)
     )
 
     return response.choices[0].message.content.strip()
 
-# ===================== INTELLIGENT HANDLER =====================
-def intelligent_command_handler(user_message: str, function_map: dict, history: list = None) -> dict:
+
+async def astream_llm(prompt: str, system_prompt: str = SUMMARIZER_SYSTEM_PROMPT,
+                      max_tokens: int = 500, stage: str = "llm.stream"):
     """
-    Intelligent command handler using function calling
+    Same request as acall_llm, but yields content deltas as they arrive
 
-    ALWAYS returns:
-    {
-        "reply": str,
-        "data": dict | None
-    }
+    `stage` times the request up to the first chunk; `stage`.total the
+    whole stream.
     """
+    with timed(f"{stage}.total"):
+        stream = await acreate_completion(
+            stage=stage,
+            **_prompt_request(prompt, system_prompt, max_tokens, stream=True)
+        )
 
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+# ===================== INTELLIGENT HANDLER =====================
+def _tool_selection_request(user_message, history):
     messages = [
         {
             "role": "system",
@@ -108,7 +566,9 @@ use get_unread_email_categories.
 - If the user asks whether they have emails from a specific sender
 (e.g., "GitHub", "Google", "LinkedIn", "from X"),
 use check_emails_from_sender with the sender name as parameter.
-- "summarize my inbox" → Use get_unread_emails_summary"""
+- "summarize my inbox" → Use get_unread_emails_summary
+- If the user asks for several things at once (e.g. "summarize my inbox
+and tell me the categories"), call every matching function."""
         }
     ]
 
@@ -122,9 +582,8 @@ use check_emails_from_sender with the sender name as parameter.
         "content": user_message
     })
 
-    # -------- First call: decide intent --------
-    response = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
+    return dict(
+        model=MODEL,
         messages=messages,
         tools=tools,
         tool_choice="auto",
@@ -132,38 +591,118 @@ use check_emails_from_sender with the sender name as parameter.
         max_tokens=500
     )
 
-    response_message = response.choices[0].message
-    tool_calls = response_message.tool_calls
 
-    # 🟢 NO TOOL CALL → GREETING / CHAT
-    if not tool_calls:
-        return {
-            "reply": response_message.content or "I'm here to help with your emails!",
-            "data": None
-        }
+async def aselect_tool_call(user_message: str, history: list = None):
+    """
+    First function-calling round: let the model pick a tool (or just chat)
+
+    Returns the assistant message; its tool_calls are not executed here.
+    """
+    response = await acreate_completion(stage="llm.tool_select", **_tool_selection_request(user_message, history))
+
+    return response.choices[0].message
+
+
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", 45))
+
+_JSON_TYPES = {"string": str, "integer": int, "number": (int, float), "boolean": bool}
+_TOOL_SCHEMAS = {tool["function"]["name"]: tool["function"]["parameters"] for tool in tools}
+
+
+def parse_tool_calls(response_message):
+    """
+    Every (function_name, arguments) the model asked for, duplicates
+    removed; empty for a chat reply. Unparseable arguments become None.
+    """
+    calls = []
+    for tool_call in response_message.tool_calls or []:
+        try:
+            function_args = json.loads(tool_call.function.arguments or "{}")
+        except ValueError:
+            function_args = None
+
+        call = (tool_call.function.name, function_args)
+        if call not in calls:
+            calls.append(call)
+
+    return calls
+
+
+def validate_tool_args(function_name: str, function_args):
+    """
+    Check arguments against the tool's JSON schema
 
-    # -------- Execute tool (ONLY FIRST TOOL CALL) --------
-    tool_call = tool_calls[0]
-    function_name = tool_call.function.name
-    function_args = json.loads(tool_call.function.arguments or "{}")
+    Returns:
+        (cleaned args, None) or (None, error message)
+    """
+    schema = _TOOL_SCHEMAS.get(function_name)
+    if schema is None:
+        return None, f"unknown tool {function_name}"
+    if not isinstance(function_args, dict):
+        return None, "arguments are not a JSON object"
+
+    properties = schema.get("properties", {})
+    unknown = set(function_args) - set(properties)
+    if unknown:
+        return None, f"unexpected argument(s): {', '.join(sorted(unknown))}"
+
+    cleaned = {}
+    for name, spec in properties.items():
+        if name not in function_args:
+            continue
+        value = function_args[name]
+        expected = _JSON_TYPES.get(spec.get("type"))
+        if expected and not isinstance(value, expected):
+            return None, f"{name} must be a {spec['type']}"
+        if isinstance(value, str):
+            value = value.strip()
+        cleaned[name] = value
+
+    missing = [name for name in schema.get("required", []) if cleaned.get(name) in (None, "")]
+    if missing:
+        return None, f"missing argument(s): {', '.join(missing)}"
 
+    return cleaned, None
+
+
+async def arun_tool(function_name: str, function_args: dict, function_map: dict) -> dict:
+    """
+    Run one tool from a map of coroutine functions by name and normalize
+    its result
+    """
     if function_name not in function_map:
         return {
             "reply": "Sorry, I can't handle that request yet.",
             "data": None
         }
 
+    function_args, error = validate_tool_args(function_name, function_args)
+    if error:
+        return _invalid_args_result(error)
+
     try:
-        if function_args:
-            function_result = function_map[function_name](**function_args)
-        else:
-            function_result = function_map[function_name]()
+        function_result = await function_map[function_name](**function_args)
     except Exception as e:
-        return {
-            "reply": "Something went wrong while fetching your emails.",
-            "data": {"error": str(e)}
-        }
+        return _tool_error_result(e)
+
+    return _normalize_tool_result(function_result)
 
+
+def _invalid_args_result(error):
+    return {
+        "reply": "Sorry, I didn't quite get that request.",
+        "data": {"error": error}
+    }
+
+
+def _tool_error_result(error):
+    return {
+        "reply": "Something went wrong while fetching your emails.",
+        "data": {"error": str(error)}
+    }
+
+
+def _normalize_tool_result(function_result):
     # -------- FORCE STANDARD RESPONSE FORMAT --------
     if isinstance(function_result, dict):
         return {
@@ -176,3 +715,60 @@ use check_emails_from_sender with the sender name as parameter.
         "reply": str(function_result),
         "data": None
     }
+
+
+_TOOL_TIMEOUT_RESULT = {
+    "reply": "That part took too long, please try again.",
+    "data": {"error": "timeout"}
+}
+
+
+async def arun_tools(calls: list, function_map: dict, timeout: float = TOOL_TIMEOUT) -> dict:
+    """
+    Run several tool calls concurrently and merge them into one response
+
+    Each tool gets `timeout` seconds; one that overruns is cancelled and
+    reported as such without holding back the others. One call keeps
+    that tool's own response shape.
+    """
+    async def run(name, args):
+        try:
+            return await asyncio.wait_for(arun_tool(name, args, function_map), timeout)
+        except asyncio.TimeoutError:
+            return _TOOL_TIMEOUT_RESULT
+
+    results = await asyncio.gather(*(run(name, args) for name, args in calls))
+
+    if len(calls) == 1:
+        return results[0]
+    return _merge_tool_results(calls, results)
+
+
+def _merge_tool_results(calls, results):
+    results = [{"tool": name, **result} for (name, _), result in zip(calls, results)]
+
+    return {
+        "reply": "\n\n".join(r["reply"] for r in results if r["reply"]),
+        "data": {"results": results}
+    }
+
+
+async def aexecute_tool_call(response_message, function_map: dict) -> dict:
+    """
+    Run the tools chosen by aselect_tool_call and normalize the result
+
+    ALWAYS returns:
+    {
+        "reply": str,
+        "data": dict | None
+    }
+    """
+    calls = parse_tool_calls(response_message)
+
+    if not calls:
+        return {
+            "reply": response_message.content or "I'm here to help with your emails!",
+            "data": None
+        }
+
+    return await arun_tools(calls, function_map)
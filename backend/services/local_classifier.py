@@ -0,0 +1,191 @@
+import os
+import re
+import json
+import math
+import zlib
+import threading
+
+from services.email_text import clean_body
+
+LOCAL_MODEL_PATH = os.getenv("LOCAL_MODEL_PATH", "cache/category_model.json")
+
+# Below this many training examples the model never answers
+LOCAL_MODEL_MIN_EXAMPLES = int(os.getenv("LOCAL_MODEL_MIN_EXAMPLES", 50))
+LOCAL_MODEL_MIN_CONFIDENCE = float(os.getenv("LOCAL_MODEL_MIN_CONFIDENCE", 0.9))
+
+N_FEATURES = 2 ** 18
+MAX_BODY_WORDS = 200
+SAVE_EVERY = 10
+
+# Bump when extract_features changes; saved counts from another version
+# are dropped instead of mixed with the new features
+FEATURES_VERSION = 2
+
+TOKEN_RE = re.compile(r"[a-z0-9]{2,}")
+
+
+def extract_features(email):
+    """
+    Hashed bag of words over sender, subject and the start of the cleaned
+    body (HTML, links, quotes and footers removed first, so the word
+    budget goes to what the sender wrote).
+
+    Sender and subject tokens are namespaced so "github" in the From line
+    counts separately from "github" in the body. crc32 keeps hashes stable
+    across processes, which matters because the model is persisted.
+    """
+    sender = (email.get("from") or "").lower()
+    subject = (email.get("subject") or "").lower()
+    body = clean_body(email.get("body") or "").lower()
+
+    tokens = ["s:" + t for t in TOKEN_RE.findall(sender)]
+    tokens += ["t:" + t for t in TOKEN_RE.findall(subject)]
+    tokens += ["b:" + t for t in TOKEN_RE.findall(body)[:MAX_BODY_WORDS]]
+
+    if email.get("list_unsubscribe"):
+        tokens.append("h:list-unsubscribe")
+    if email.get("precedence"):
+        tokens.append("h:precedence:" + email["precedence"])
+
+    return [zlib.crc32(t.encode("utf-8")) % N_FEATURES for t in tokens]
+
+
+class HashedNaiveBayes:
+    """
+    Multinomial naive Bayes over hashed features, trained one example at a
+    time from LLM-assigned labels and persisted as JSON.
+    """
+
+    def __init__(self, path=LOCAL_MODEL_PATH):
+        self.path = path
+        self.class_counts = {}    # category -> documents seen
+        self.feature_counts = {}  # category -> {feature: count}
+        self.total_features = {}  # category -> sum of feature counts
+        self._lock = threading.Lock()
+        # Serializes writers of the shared temp file
+        self._save_lock = threading.Lock()
+        self._unsaved = 0
+        # Bumped per learned example; a save never replaces a newer one on disk
+        self._generation = 0
+        self._saved_generation = -1
+        self._load()
+
+    @property
+    def examples(self):
+        return sum(self.class_counts.values())
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get("version") != FEATURES_VERSION:
+            return
+
+        self.class_counts = state.get("class_counts", {})
+        self.feature_counts = {
+            category: {int(k): v for k, v in counts.items()}
+            for category, counts in state.get("feature_counts", {}).items()
+        }
+        self.total_features = state.get("total_features", {})
+
+    def save(self):
+        if not self.path:
+            return
+
+        with self._lock:
+            state = json.dumps({
+                "version": FEATURES_VERSION,
+                "class_counts": self.class_counts,
+                "feature_counts": self.feature_counts,
+                "total_features": self.total_features
+            })
+            generation = self._generation
+            self._unsaved = 0
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with self._save_lock:
+            # A concurrent save serialized later state and got here first
+            if generation <= self._saved_generation:
+                return
+            with open(tmp, "w") as f:
+                f.write(state)
+            os.replace(tmp, self.path)
+            self._saved_generation = generation
+
+    def learn(self, email, category):
+        features = extract_features(email)
+
+        with self._lock:
+            self.class_counts[category] = self.class_counts.get(category, 0) + 1
+            counts = self.feature_counts.setdefault(category, {})
+            for feature in features:
+                counts[feature] = counts.get(feature, 0) + 1
+            self.total_features[category] = self.total_features.get(category, 0) + len(features)
+            self._generation += 1
+            self._unsaved += 1
+            should_save = self._unsaved >= SAVE_EVERY
+            if should_save:
+                # Claimed here so concurrent learners don't all save at once
+                self._unsaved = 0
+
+        if should_save:
+            self.save()
+
+    def predict(self, email):
+        """
+        Returns:
+            (category, posterior probability), or (None, 0.0) when untrained
+        """
+        features = extract_features(email)
+
+        with self._lock:
+            total = sum(self.class_counts.values())
+            if not total:
+                return None, 0.0
+
+            scores = {}
+            for category, docs in self.class_counts.items():
+                counts = self.feature_counts.get(category, {})
+                # Laplace smoothing over the hashed feature space
+                denominator = self.total_features.get(category, 0) + N_FEATURES
+                score = math.log(docs / total)
+                for feature in features:
+                    score += math.log((counts.get(feature, 0) + 1) / denominator)
+                scores[category] = score
+
+        best = max(scores, key=scores.get)
+        top = scores[best]
+        normalizer = sum(math.exp(score - top) for score in scores.values())
+        return best, 1.0 / normalizer
+
+    def classify(self, email):
+        """
+        Category if the model is trained enough and confident, else None
+        """
+        # A model that has only seen one class is trivially "confident"
+        if self.examples < LOCAL_MODEL_MIN_EXAMPLES or len(self.class_counts) < 2:
+            return None
+
+        category, confidence = self.predict(email)
+        return category if confidence >= LOCAL_MODEL_MIN_CONFIDENCE else None
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_local_model():
+    global _model
+
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = HashedNaiveBayes()
+
+    return _model
@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import threading
+
+from services.metrics import timed
+from services.sqlite_cache import SQLiteCache
+
+# Bump whenever body or attachment extraction changes so stale rows are
+# re-processed instead of served
+PROCESSING_VERSION = 2
+
+MESSAGE_CACHE_PATH = os.getenv("MESSAGE_CACHE_PATH", "cache/messages.db")
+MESSAGE_CACHE_MAX_BYTES = int(os.getenv("MESSAGE_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+
+
+class MessageCache(SQLiteCache):
+    """
+    Persistent cache of parsed Gmail messages keyed by message ID.
+
+    Stores headers, decoded body and extracted attachment text together
+    with the PROCESSING_VERSION that produced them. Once the stored
+    payload exceeds max_bytes the least recently used rows are evicted.
+    """
+
+    TABLE = "messages"
+    KEY_COLUMN = "id"
+
+    def __init__(self, path=MESSAGE_CACHE_PATH, max_bytes=MESSAGE_CACHE_MAX_BYTES,
+                 version=PROCESSING_VERSION):
+        super().__init__(
+            path,
+            [
+                """
+                CREATE TABLE IF NOT EXISTS messages (
+                    id TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    headers TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    attachments TEXT NOT NULL,
+                    attachment_text TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """,
+                "CREATE INDEX IF NOT EXISTS idx_messages_accessed ON messages(accessed_at)"
+            ],
+            max_bytes=max_bytes
+        )
+        self.version = version
+        self._counter_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def _count(self, counter):
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    # -------------------- read --------------------
+    def get(self, message_id):
+        with timed("cache.message"):
+            row = self._conn().execute(
+                "SELECT version, headers, body, attachments, attachment_text "
+                "FROM messages WHERE id = ?",
+                (message_id,)
+            ).fetchone()
+
+            if row is None:
+                self._count("misses")
+                return None
+
+            version, headers, body, attachments, attachment_text = row
+            if version != self.version:
+                self._count("stale")
+                self._count("misses")
+                return None
+
+            self._count("hits")
+            self._touch(message_id)
+
+            return {
+                "headers": json.loads(headers),
+                "body": body,
+                "attachments": json.loads(attachments),
+                "attachment_text": attachment_text
+            }
+
+    def contains(self, message_id):
+        row = self._conn().execute(
+            "SELECT 1 FROM messages WHERE id = ? AND version = ?",
+            (message_id, self.version)
+        ).fetchone()
+        return row is not None
+
+    # -------------------- write --------------------
+    def put(self, message_id, headers, body, attachments, attachment_text):
+        headers_json = json.dumps(headers)
+        attachments_json = json.dumps(attachments)
+        size = len(headers_json) + len(body) + len(attachments_json) + len(attachment_text)
+
+        self._store(
+            "INSERT OR REPLACE INTO messages "
+            "(id, version, headers, body, attachments, attachment_text, size, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (message_id, self.version, headers_json, body, attachments_json,
+             attachment_text, size, time.time())
+        )
+
+    # -------------------- metrics --------------------
+    def stats(self):
+        entries, total = self._disk_usage()
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "version": self.version
+        }
+
+
+_message_cache = None
+_message_cache_lock = threading.Lock()
+
+
+def get_message_cache():
+    global _message_cache
+
+    if _message_cache is None:
+        with _message_cache_lock:
+            if _message_cache is None:
+                _message_cache = MessageCache()
+
+    return _message_cache
@@ -0,0 +1,195 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+# Requests slower than this are logged with their per-stage breakdown
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", 5))
+
+# Seconds; from a cache hit (sub-millisecond) to a slow LLM call
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """
+    Prometheus histogram with a single label, rendered in the text
+    exposition format
+    """
+
+    def __init__(self, name, help_text, label, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series = {}  # label value -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, seconds):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[index] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self):
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_value, values in sorted(series.items()):
+            label = f'{self.label}="{label_value}"'
+            # Counts are already cumulative: every bucket at or above the value was incremented
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {values[-1]}')
+            lines.append(f"{self.name}_sum{{{label}}} {values[-2]}")
+            lines.append(f"{self.name}_count{{{label}}} {values[-1]}")
+        return lines
+
+
+stage_seconds = Histogram(
+    "inboxai_stage_seconds", "Time spent in each pipeline stage.", "stage"
+)
+request_seconds = Histogram(
+    "inboxai_request_seconds", "HTTP request latency by route.", "route"
+)
+
+
+def render_metrics():
+    return "\n".join(stage_seconds.render() + request_seconds.render()) + "\n"
+
+
+# ============================ PER-REQUEST TIMINGS ============================
+
+class RequestTimings:
+    """
+    Stage durations of one request, summed per stage (concurrent stages
+    can add up to more than the request took)
+    """
+
+    def __init__(self):
+        self._stages = {}  # stage -> [seconds, calls]
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            entry = self._stages.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: tuple(entry) for stage, entry in self._stages.items()}
+
+    def header(self, total):
+        parts = [
+            f'{stage};dur={seconds * 1000:.1f};desc="{calls}x"'
+            for stage, (seconds, calls) in sorted(self.snapshot().items())
+        ]
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_request_timings = ContextVar("request_timings", default=None)
+
+
+def record(stage, seconds):
+    stage_seconds.observe(stage, seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextmanager
+def timed(stage):
+    """
+    Time the block as `stage`, for /metrics and the current request's
+    Server-Timing header; works around awaits too
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def carry_timings(fn):
+    """
+    Wrap fn so it reports into the calling request's timings when run on
+    a plain thread pool (asyncio.to_thread already copies the context)
+    """
+    timings = _request_timings.get()
+
+    def run(*args, **kwargs):
+        token = _request_timings.set(timings)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _request_timings.reset(token)
+
+    return run
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware: collects the stage timings of each HTTP request,
+    sends them as a Server-Timing header, records the request latency
+    per route and logs slow requests with their breakdown.
+
+    Streaming responses send headers first, so their header only covers
+    the stages that finished before the first byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timings.header(time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            elapsed = time.perf_counter() - start
+
+            route = scope.get("route")
+            route = getattr(route, "path", None) or "unmatched"
+            request_seconds.observe(f"{scope['method']} {route}", elapsed)
+
+            if elapsed >= SLOW_REQUEST_SECONDS:
+                logger.warning("slow request", extra={
+                    "route": route,
+                    "method": scope["method"],
+                    "status": status,
+                    "duration_ms": round(elapsed * 1000, 1),
+                    "stages_ms": {
+                        stage: round(seconds * 1000, 1)
+                        for stage, (seconds, _) in timings.snapshot().items()
+                    }
+                })
@@ -0,0 +1,205 @@
+import os
+import time
+import asyncio
+import logging
+
+from services.gmail_client import FETCH_IDS, FETCH_FULL
+from services.inbox_snapshot import get_inbox_snapshot_async, invalidate_inbox_snapshots
+from services.llm_client import breaker, rate_limiter
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "0") == "1"
+PREFETCH_INTERVAL = float(os.getenv("PREFETCH_INTERVAL", 60))
+# Same view the /command tools read, so their snapshot is the one warmed
+PREFETCH_MAX_RESULTS = int(os.getenv("PREFETCH_MAX_RESULTS", 10))
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", 2))
+PREFETCH_QUEUE_SIZE = int(os.getenv("PREFETCH_QUEUE_SIZE", 50))
+# Background work yields once less than this share of the LLM budget is left
+PREFETCH_MIN_HEADROOM = float(os.getenv("PREFETCH_MIN_HEADROOM", 0.5))
+PREFETCH_BACKOFF = 5.0
+
+logger = logging.getLogger(__name__)
+
+
+class PrefetchWorker:
+    """
+    Summarizes and categorizes new unread mail before anyone asks.
+
+    Every `interval` seconds, or as soon as notify() is called (the Gmail
+    push hook), the worker lists unread IDs; when new ones have arrived it
+    refreshes the full inbox snapshot (bodies and attachments), runs
+    `process_batch` once over the new messages and queues them;
+    `concurrency` consumers then run `process` on each. Together they fill
+    the summary and category caches that /command then reads.
+
+    `process(email)` returns True when its result fell back (LLM failure)
+    and `process_batch(emails)` returns the IDs that fell back; those are
+    forgotten so the next poll that still sees them unread retries them.
+
+    The queue is bounded: messages that don't fit stay unseen and are
+    offered again on the next poll. Consumers also wait while the LLM
+    circuit is open or the shared rate limit is mostly spent, so
+    interactive requests keep priority.
+    """
+
+    def __init__(self, process, process_batch=None, interval=PREFETCH_INTERVAL,
+                 max_results=PREFETCH_MAX_RESULTS, concurrency=PREFETCH_CONCURRENCY,
+                 queue_size=PREFETCH_QUEUE_SIZE, min_headroom=PREFETCH_MIN_HEADROOM):
+        self.process = process
+        self.process_batch = process_batch
+        self.interval = interval
+        self.max_results = max_results
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.min_headroom = min_headroom
+
+        self._queue = None
+        self._wake = None
+        self._tasks = []
+        self._known = set()  # queued or done, pruned to what is still unread
+
+        self.polls = 0
+        self.processed = 0
+        self.failed = 0
+        self.degraded = 0
+        self.deferred = 0
+        self.throttled_seconds = 0.0
+        self.last_poll_at = None
+        self.last_processed_at = None
+
+    @property
+    def running(self):
+        return bool(self._tasks)
+
+    def start(self):
+        """
+        Start polling and processing; must be called from the event loop
+        """
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._poll_loop())] + [
+            asyncio.create_task(self._consume()) for _ in range(self.concurrency)
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """
+        Poll now instead of waiting out the interval
+        """
+        if self._wake is not None:
+            self._wake.set()
+
+    # -------------------- polling --------------------
+    async def _poll_loop(self):
+        while True:
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("prefetch poll failed")
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def poll(self):
+        """
+        One round: cheap ID listing first, the full fetch only when
+        something new arrived
+        """
+        self.polls += 1
+        self.last_poll_at = time.time()
+
+        ids = [
+            email["id"] for email in
+            await get_inbox_snapshot_async(max_results=self.max_results, level=FETCH_IDS)
+        ]
+        self._known &= set(ids)
+
+        if all(message_id in self._known for message_id in ids):
+            return 0
+
+        # A user request arriving now joins this fetch rather than starting its own
+        invalidate_inbox_snapshots()
+        emails = await get_inbox_snapshot_async(max_results=self.max_results, level=FETCH_FULL)
+
+        queued = []
+        for email in emails:
+            if email["id"] in self._known:
+                continue
+            try:
+                self._queue.put_nowait(email)
+            except asyncio.QueueFull:
+                # Left unknown, so the next poll offers it again
+                self.deferred += 1
+                continue
+            self._known.add(email["id"])
+            queued.append(email)
+
+        if queued and self.process_batch is not None:
+            await self._run_batch(queued)
+
+        return len(queued)
+
+    async def _run_batch(self, emails):
+        await self._wait_for_capacity()
+        try:
+            retry = await self.process_batch(emails)
+        except Exception:
+            logger.exception("prefetch batch failed", extra={"messages": len(emails)})
+            self.failed += 1
+            retry = [email["id"] for email in emails]
+
+        # Their per-message work is redone on the retry too, but finds the cache warm
+        self.degraded += len(retry)
+        self._known.difference_update(retry)
+
+    # -------------------- processing --------------------
+    async def _wait_for_capacity(self):
+        while breaker.state != "closed" or rate_limiter.headroom() < self.min_headroom:
+            self.throttled_seconds += PREFETCH_BACKOFF
+            await asyncio.sleep(PREFETCH_BACKOFF)
+
+    async def _consume(self):
+        while True:
+            email = await self._queue.get()
+            try:
+                await self._wait_for_capacity()
+                if await self.process(email):
+                    self.degraded += 1
+                    self._known.discard(email["id"])
+                else:
+                    self.processed += 1
+                    self.last_processed_at = time.time()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("prefetch failed", extra={"message_id": email["id"]})
+                self.failed += 1
+                # Retried on the next poll that still sees it unread
+                self._known.discard(email["id"])
+            finally:
+                self._queue.task_done()
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "polls": self.polls,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "processed": self.processed,
+            "failed": self.failed,
+            "degraded": self.degraded,
+            "deferred": self.deferred,
+            "throttled_seconds": self.throttled_seconds,
+            "last_poll_at": self.last_poll_at,
+            "last_processed_at": self.last_processed_at
+        }
@@ -1,11 +1,25 @@
+# Categories must stay within email_categorizer.ALLOWED_CATEGORIES
 SENDER_CATEGORY_MAP = {
     "linkedin.com": "Promotions",
-    "github.com": "Work",
+    "github.com": "Updates",
     "google.com": "Updates",
-    "bank": "Finance",
+    "bank": "Primary",
     "no-reply": "Updates",
+    "noreply": "Updates",
 }
 
+# Gmail's own tab classification, when present, is a strong signal
+GMAIL_LABEL_CATEGORY_MAP = {
+    "SPAM": "Spam",
+    "CATEGORY_PROMOTIONS": "Promotions",
+    "CATEGORY_SOCIAL": "Social",
+    "CATEGORY_UPDATES": "Updates",
+    "CATEGORY_FORUMS": "Updates",
+    "CATEGORY_PERSONAL": "Primary",
+}
+
+BULK_PRECEDENCE = {"bulk", "list", "junk"}
+
 def categorize_by_sender(sender: str) -> str | None:
     sender = sender.lower()
 
@@ -14,3 +28,14 @@ def categorize_by_sender(sender: str) -> str | None:
             return category
 
     return None
+
+
+def categorize_by_headers(email: dict) -> str | None:
+    for label in email.get("labels", []):
+        if label in GMAIL_LABEL_CATEGORY_MAP:
+            return GMAIL_LABEL_CATEGORY_MAP[label]
+
+    if email.get("precedence") in BULK_PRECEDENCE or email.get("list_unsubscribe"):
+        return "Promotions"
+
+    return None
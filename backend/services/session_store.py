@@ -0,0 +1,152 @@
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+
+from services.email_text import count_tokens, truncate_to_tokens
+
+# Recent turns kept verbatim (user + assistant messages)
+SESSION_WINDOW_MESSAGES = int(os.getenv("SESSION_WINDOW_MESSAGES", 6))
+# Hard cap on everything a session adds to a prompt
+SESSION_HISTORY_TOKENS = int(os.getenv("SESSION_HISTORY_TOKENS", 800))
+SESSION_SUMMARY_TOKENS = int(os.getenv("SESSION_SUMMARY_TOKENS", 250))
+# Long replies (a whole inbox read out) are clipped before they are kept
+SESSION_MESSAGE_TOKENS = int(os.getenv("SESSION_MESSAGE_TOKENS", 150))
+# Gist of a turn once it leaves the window
+SESSION_GIST_TOKENS = 40
+
+SESSION_TTL = float(os.getenv("SESSION_TTL", 1800))
+SESSION_MAX = int(os.getenv("SESSION_MAX", 1000))
+
+
+def _clip(text, max_tokens):
+    text, truncated = truncate_to_tokens(" ".join((text or "").split()), max_tokens)
+    return text + " ..." if truncated else text
+
+
+class Session:
+    def __init__(self):
+        self.messages = []  # [{"role", "content"}], oldest first
+        self.summary = ""
+        self.touched_at = time.monotonic()
+
+    def tokens(self):
+        return count_tokens(self.summary) + sum(count_tokens(m["content"]) for m in self.messages)
+
+    def _compact_oldest(self):
+        message = self.messages.pop(0)
+        speaker = "User" if message["role"] == "user" else "Assistant"
+        gist = f"{speaker}: {_clip(message['content'], SESSION_GIST_TOKENS)}"
+
+        # Rolling summary: newest gists are kept, the oldest fall off the front
+        gists = self.summary.split("\n") if self.summary else []
+        gists.append(gist)
+        while len(gists) > 1 and count_tokens("\n".join(gists)) > SESSION_SUMMARY_TOKENS:
+            gists.pop(0)
+        self.summary = "\n".join(gists)
+
+    def add(self, role, content):
+        self.messages.append({"role": role, "content": _clip(content, SESSION_MESSAGE_TOKENS)})
+
+        while len(self.messages) > SESSION_WINDOW_MESSAGES:
+            self._compact_oldest()
+        while self.messages and self.tokens() > SESSION_HISTORY_TOKENS:
+            self._compact_oldest()
+
+    def history(self):
+        """
+        Messages to prepend to a prompt: the compacted summary (if any)
+        followed by the recent window
+        """
+        history = []
+        if self.summary:
+            history.append({
+                "role": "system",
+                "content": f"Summary of earlier conversation:\n{self.summary}"
+            })
+        return history + [dict(m) for m in self.messages]
+
+
+class SessionStore:
+    """
+    In-process conversation sessions keyed by an opaque session ID.
+
+    Each session keeps a short window of recent messages plus a rolling,
+    extractive summary of older ones, under a hard token cap, so the
+    prompt a conversation adds stays the same size however long it runs.
+    Idle sessions expire after `ttl` and the least recently used are
+    dropped beyond `max_sessions`.
+    """
+
+    def __init__(self, ttl=SESSION_TTL, max_sessions=SESSION_MAX):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.expired = 0
+
+    def _expire(self, now):
+        # Caller holds _lock; the OrderedDict is in least recently used order
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.touched_at < self.ttl and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[session_id]
+            self.expired += 1
+
+    def open(self, session_id=None, client_history=None):
+        """
+        Look up (or start) a session
+
+        A client that still sends its own history gets it folded into a
+        new session, bounded like any other.
+
+        Returns:
+            (session_id, history messages for the prompt)
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            self._expire(now)
+
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session_id = uuid.uuid4().hex
+                session = Session()
+                for message in client_history or []:
+                    if message.get("role") in ("user", "assistant"):
+                        session.add(message["role"], message.get("content", ""))
+                self._sessions[session_id] = session
+                self.created += 1
+
+            session.touched_at = now
+            self._sessions.move_to_end(session_id)
+            return session_id, session.history()
+
+    def record(self, session_id, command, reply):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            session.add("user", command)
+            session.add("assistant", reply)
+            session.touched_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "created": self.created,
+                "expired": self.expired,
+                "window_messages": SESSION_WINDOW_MESSAGES,
+                "history_token_cap": SESSION_HISTORY_TOKENS
+            }
+
+
+_store = SessionStore()
+
+
+def get_session_store():
+    return _store
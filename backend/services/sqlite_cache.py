@@ -0,0 +1,156 @@
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# Read hits only note their access time; the notes are written in one
+# statement with the next write, or once this many are pending
+TOUCH_FLUSH_ENTRIES = int(os.getenv("CACHE_TOUCH_FLUSH_ENTRIES", 64))
+
+
+class SQLiteCache:
+    """
+    Base for the persistent caches: one SQLite table in WAL mode with a
+    connection per thread, so FastAPI workers read concurrently while a
+    single writer appends, and an optional in-process LRU in front of it.
+
+    Size-bounded caches (max_bytes set) keep `size` and `accessed_at`
+    columns and evict the least recently used rows once the stored
+    payload exceeds max_bytes. Access times are buffered rather than
+    written per hit, so reads never queue behind the write lock; a crash
+    only loses some recency, never data.
+    """
+
+    TABLE = None
+    KEY_COLUMN = "key"
+
+    def __init__(self, path, schema, max_bytes=None, memory_entries=0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._touched = {}  # key -> access time not yet written
+        self._touch_lock = threading.Lock()
+        self.evictions = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in schema:
+            conn.execute(statement)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # -------------------- memory tier --------------------
+    def _recall(self, key):
+        # Caller holds _memory_lock
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+        return value
+
+    def _remember(self, key, value):
+        # Caller holds _memory_lock
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    # -------------------- access times --------------------
+    def _touch(self, key):
+        with self._touch_lock:
+            self._touched[key] = time.time()
+            due = len(self._touched) >= TOUCH_FLUSH_ENTRIES
+
+        # A writer holding the lock flushes the notes itself
+        if due and self._write_lock.acquire(blocking=False):
+            try:
+                conn = self._conn()
+                self._flush_touches(conn)
+                conn.commit()
+            finally:
+                self._write_lock.release()
+
+    def _flush_touches(self, conn):
+        # Caller holds _write_lock
+        with self._touch_lock:
+            touched, self._touched = self._touched, {}
+
+        if touched:
+            conn.executemany(
+                f"UPDATE {self.TABLE} SET accessed_at = ? WHERE {self.KEY_COLUMN} = ?",
+                [(accessed_at, key) for key, accessed_at in touched.items()]
+            )
+
+    # -------------------- write --------------------
+    def _store(self, sql, params):
+        with self._write_lock:
+            conn = self._conn()
+            self._flush_touches(conn)
+            conn.execute(sql, params)
+            if self.max_bytes is not None:
+                self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn):
+        total = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.TABLE}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Walk from least recently used until enough bytes are freed
+        rows = conn.execute(
+            f"SELECT {self.KEY_COLUMN}, size FROM {self.TABLE} ORDER BY accessed_at"
+        ).fetchall()
+        victims = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+
+        conn.executemany(f"DELETE FROM {self.TABLE} WHERE {self.KEY_COLUMN} = ?", victims)
+        self.evictions += len(victims)
+
+    def _delete(self, where="", params=()):
+        """
+        Returns:
+            number of rows removed from disk
+        """
+        with self._write_lock:
+            with self._touch_lock:
+                self._touched.clear()
+
+            conn = self._conn()
+            removed = conn.execute(f"DELETE FROM {self.TABLE}{where}", params).rowcount
+            conn.commit()
+
+        return removed
+
+    def clear(self):
+        with self._memory_lock:
+            self._memory.clear()
+
+        self._delete()
+
+    # -------------------- metrics --------------------
+    def _disk_usage(self):
+        """
+        Returns:
+            (rows, stored bytes)
+        """
+        return tuple(self._conn().execute(
+            f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.TABLE}"
+        ).fetchone())
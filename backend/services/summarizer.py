@@ -1,17 +1,10 @@
-import re
+from services.email_text import clean_body
 
 def clean_sender(sender: str) -> str:
     # "Team Unstop <noreply@x.com>" → "Team Unstop"
     return sender.split("<")[0].strip()
 
 
-def clean_body(text: str) -> str:
-    text = re.sub(r"http\S+", "", text)        # remove links
-    text = re.sub(r"\s+", " ", text)            # normalize spaces
-    text = re.sub(r"[^\x00-\x7F]+", " ", text)  # remove weird unicode
-    return text.strip()
-
-
 def summarize_emails(llm, emails):
     if not emails:
         return {
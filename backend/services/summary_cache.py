@@ -0,0 +1,186 @@
+import os
+import asyncio
+import time
+import hashlib
+import threading
+
+from services.metrics import timed
+from services.sqlite_cache import SQLiteCache
+
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", "cache/summaries.db")
+SUMMARY_CACHE_MEMORY_ENTRIES = int(os.getenv("SUMMARY_CACHE_MEMORY_ENTRIES", 1024))
+
+
+def fingerprint(*parts):
+    """
+    Stable short hash of the given strings (content or prompt/model)
+    """
+    sha = hashlib.sha256()
+    for part in parts:
+        sha.update((part or "").encode("utf-8", errors="ignore"))
+        sha.update(b"\x00")
+    return sha.hexdigest()[:32]
+
+
+class SummaryCache(SQLiteCache):
+    """
+    Persistent cache of LLM outputs (summaries, categories) per message.
+
+    Rows are keyed by (kind, message_id) and only served when both the
+    content hash and the prompt version match, so an edited prompt, a
+    model swap or a changed body quietly misses instead of returning a
+    stale answer. Hot entries are answered from an in-process LRU, and
+    single_flight() lets concurrent misses for one entry share one LLM
+    call.
+    """
+
+    TABLE = "summaries"
+
+    def __init__(self, path=SUMMARY_CACHE_PATH, memory_entries=SUMMARY_CACHE_MEMORY_ENTRIES):
+        super().__init__(
+            path,
+            [
+                """
+                CREATE TABLE IF NOT EXISTS summaries (
+                    kind TEXT NOT NULL,
+                    message_id TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (kind, message_id)
+                )
+                """
+            ],
+            memory_entries=memory_entries
+        )
+        self._in_flight = {}  # (kind, message_id) -> asyncio.Future
+        self.hits = 0
+        self.misses = 0
+        self.shared_in_flight = 0
+
+    def get(self, kind, message_id, content_hash, prompt_version):
+        with timed("cache.summary"):
+            key = (kind, message_id)
+
+            with self._memory_lock:
+                entry = self._recall(key)
+                if entry is not None and entry[:2] == (content_hash, prompt_version):
+                    self.hits += 1
+                    return entry[2]
+
+            row = self._conn().execute(
+                "SELECT content_hash, prompt_version, value FROM summaries "
+                "WHERE kind = ? AND message_id = ?",
+                (kind, message_id)
+            ).fetchone()
+
+            with self._memory_lock:
+                if row is None or tuple(row[:2]) != (content_hash, prompt_version):
+                    self.misses += 1
+                    return None
+
+                self.hits += 1
+                self._remember(key, tuple(row))
+                return row[2]
+
+    def put(self, kind, message_id, content_hash, prompt_version, value):
+        with self._memory_lock:
+            self._remember((kind, message_id), (content_hash, prompt_version, value))
+
+        self._store(
+            "INSERT OR REPLACE INTO summaries "
+            "(kind, message_id, content_hash, prompt_version, value, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, message_id, content_hash, prompt_version, value, time.time())
+        )
+
+    def purge(self, kind=None, message_id=None):
+        """
+        Delete entries, optionally only one kind and/or one message
+
+        Returns:
+            number of rows removed from disk
+        """
+        clauses = []
+        params = []
+        if kind:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if message_id:
+            clauses.append("message_id = ?")
+            params.append(message_id)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._memory_lock:
+            for key in list(self._memory):
+                if (not kind or key[0] == kind) and (not message_id or key[1] == message_id):
+                    del self._memory[key]
+
+        return self._delete(where, params)
+
+    async def single_flight(self, kind, message_id, compute):
+        """
+        Await compute() once for concurrent callers missing the same
+        (kind, message_id); the others wait for its result. Event loop only.
+
+        If the caller doing the work is cancelled, a waiting caller takes
+        over instead of failing with it.
+        """
+        key = (kind, message_id)
+
+        while True:
+            future = self._in_flight.get(key)
+            if future is None:
+                break
+            self.shared_in_flight += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieved here so a leader without followers doesn't warn
+            future.exception()
+            raise
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+        future.set_result(result)
+        return result
+
+    def stats(self):
+        entries = self._conn().execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared_in_flight": self.shared_in_flight,
+            "memory_entries": len(self._memory),
+            "disk_entries": entries
+        }
+
+
+_summary_cache = None
+_summary_cache_lock = threading.Lock()
+
+
+def get_summary_cache():
+    global _summary_cache
+
+    if _summary_cache is None:
+        with _summary_cache_lock:
+            if _summary_cache is None:
+                _summary_cache = SummaryCache()
+
+    return _summary_cache
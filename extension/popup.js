@@ -4,7 +4,19 @@ const sendBtn = document.getElementById("send");
 const chatMessages = document.getElementById("chatMessages");
 const themeToggle = document.getElementById("themeToggle");
 const body = document.body;
-let conversationHistory = [];
+// The backend keeps the conversation; we only hold its session ID
+let sessionId = null;
+
+const API_BASE = "https://inboxai-backend-tb5j.onrender.com";
+
+// Follow-ups answered straight from a cached inbox view
+const INBOX_VIEW_FOLLOW_UPS = {
+  "summarize them": "/summarize/unread",
+  "summarize": "/summarize/unread",
+  "summarise them": "/summarize/unread",
+  "categorize them": "/categories/unread",
+  "categorise them": "/categories/unread"
+};
 
 // ===================== THEME =====================
 const savedTheme = localStorage.getItem("theme") || "light";
@@ -41,10 +53,11 @@ document.addEventListener(
   { once: true }
 );
 
-function speak(text) {
+// queue=true appends to what is already being spoken (streamed summaries)
+function speak(text, queue = false) {
   if (!speechUnlocked || !text.trim()) return;
 
-  speechSynthesis.cancel();
+  if (!queue) speechSynthesis.cancel();
   const utterance = new SpeechSynthesisUtterance(text);
   utterance.lang = "en-US";
 
@@ -58,7 +71,7 @@ function speak(text) {
 }
 
 // ===================== CHAT HELPERS =====================
-function addMessage(text, type) {
+function addMessage(text, type, queueSpeech = false) {
   const div = document.createElement("div");
   div.className = `message ${type}`;
 
@@ -71,7 +84,60 @@ function addMessage(text, type) {
   chatMessages.appendChild(div);
   chatMessages.scrollTop = chatMessages.scrollHeight;
 
-  if (type === "bot") speak(text);
+  if (type === "bot") speak(text, queueSpeech);
+}
+
+// Parse a server-sent event stream from a fetch() response
+async function* readEvents(res) {
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) return;
+    buffer += decoder.decode(value, { stream: true });
+
+    let end;
+    while ((end = buffer.indexOf("\n\n")) !== -1) {
+      const frame = buffer.slice(0, end);
+      buffer = buffer.slice(end + 2);
+
+      let event = "message";
+      let data = "";
+      for (const line of frame.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data += line.slice(5).trim();
+      }
+      yield { event, data: data ? JSON.parse(data) : null };
+    }
+  }
+}
+
+// GET an inbox view, revalidating the copy we hold with If-None-Match;
+// the backend records the command as a turn of the session either way
+async function fetchInboxView(path, command) {
+  const key = `inboxView:${path}`;
+  const cached = JSON.parse(localStorage.getItem(key) || "null");
+  const params = new URLSearchParams({ command });
+  if (sessionId) params.set("session_id", sessionId);
+
+  const headers = {};
+  if (cached) headers["If-None-Match"] = cached.etag;
+
+  const res = await fetch(`${API_BASE}${path}?${params}`, { headers, cache: "no-cache" });
+  const session = res.headers.get("X-Session-Id");
+  if (session) sessionId = session;
+
+  if (res.status === 304 && cached) return cached.data;
+  if (!res.ok) throw new Error(`HTTP ${res.status}`);
+
+  const data = await res.json();
+  const etag = res.headers.get("ETag");
+  // Degraded answers come without an ETag and must not be reused
+  if (etag) localStorage.setItem(key, JSON.stringify({ etag, data }));
+  else localStorage.removeItem(key);
+  return data;
 }
 
 function showThinking() {
@@ -103,34 +169,59 @@ async function sendCommand() {
   showThinking();
 
   try {
+    const viewPath = INBOX_VIEW_FOLLOW_UPS[command.toLowerCase()];
+    if (viewPath) {
+      const data = await fetchInboxView(viewPath, command);
+      removeThinking();
+      addMessage(data.reply, "bot");
+      return;
+    }
+
     const res = await fetch(
-      "https://inboxai-backend-tb5j.onrender.com/command",
+      `${API_BASE}/command/stream`,
       {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ command, history: conversationHistory })
+        body: JSON.stringify({ command, session_id: sessionId })
       }
     );
 
-    // Update history with user's command after sending
-    conversationHistory.push({ role: "user", content: command });
-
     if (!res.ok) {
       throw new Error(`HTTP ${res.status}`);
     }
 
-    const data = await res.json();
-    console.log("Backend response:", data);
-    removeThinking();
+    // Summaries stream in one email at a time; other commands send a single "done"
+    let streamed = false;
 
-    // ✅ SINGLE SOURCE OF TRUTH
-    if (typeof data.reply === "string") {
-      addMessage(data.reply, "bot");
-      conversationHistory.push({ role: "assistant", content: data.reply });
-      return;
+    for await (const { event, data } of readEvents(res)) {
+      console.log("Backend event:", event, data);
+
+      if (event === "start") {
+        removeThinking();
+        streamed = true;
+        addMessage(`You have ${data.email_count} unread emails.`, "bot");
+      } else if (event === "summary") {
+        addMessage(
+          `Email ${data.index} is from ${data.sender}. ${data.summary}`,
+          "bot",
+          true
+        );
+      } else if (event === "done") {
+        removeThinking();
+
+        // ✅ SINGLE SOURCE OF TRUTH
+        if (typeof data.reply === "string") {
+          if (!streamed) addMessage(data.reply, "bot");
+          if (data.session_id) sessionId = data.session_id;
+          return;
+        }
+      } else if (event === "error") {
+        throw new Error(data.detail);
+      }
     }
 
     // Safety fallback (should never hit)
+    removeThinking();
     addMessage("Something went wrong, but I’m still alive 👀", "bot");
 
   } catch (err) {